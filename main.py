@@ -1,6 +1,25 @@
 import os
 import sys
-import subprocess
+import argparse
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_PATH = os.path.join(BASE_DIR, 'modules', 'streamlit_app.py')
+
+# Import-time budget (milliseconds, cumulative) for the modules loaded before the
+# Tk window or the first Streamlit paint. pandas dominates data_handler; the rest
+# must stay thin wrappers whose heavy dependencies load on first use.
+STARTUP_BUDGET_MS = {
+    'modules.data_handler': 1500,
+    'modules.visualizer': 50,
+    'modules.gui': 400,
+}
+# Third-party modules a budgeted module needs before it can import at all; it is
+# skipped (not failed) when one of them is not installed.
+REQUIRES = {
+    'modules.gui': ['tkinter', 'tkcalendar'],
+}
+# Libraries that must not be pulled in just by importing the app modules.
+LAZY_MODULES = ['matplotlib', 'plotly', 'seaborn', 'fpdf', 'reportlab']
 
 def check_files():
     missing = []
@@ -15,7 +34,175 @@ def check_files():
         return False
     return True
 
+def measure_import_times(modules):
+    """Import `modules` in a fresh interpreter under `-X importtime`.
+
+    Returns (times, error): a dict of module name -> cumulative import time in
+    milliseconds, and the last line of the traceback if an import failed (None
+    otherwise). Modules at or after the failing one are absent from times.
+    """
+    import subprocess
+    code = '; '.join(f'import {m}' for m in modules)
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                          cwd=BASE_DIR, capture_output=True, text=True)
+    times = {}
+    other = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            other.append(line)
+            continue
+        try:
+            _, cumulative, name = line.split('|')
+            times[name.strip()] = int(cumulative.strip()) / 1000.0
+        except ValueError:
+            continue
+    error = None
+    if proc.returncode != 0:
+        error = next((l for l in reversed(other) if l.strip()), f'exit status {proc.returncode}')
+    return times, error
+
+def startup_check() -> bool:
+    """Compare import times against STARTUP_BUDGET_MS; False on any regression.
+
+    A module that fails to import or never shows up in the import log counts
+    as a failure. Modules whose REQUIRES are not installed are skipped.
+    """
+    from importlib.util import find_spec
+    modules = []
+    for mod in STARTUP_BUDGET_MS:
+        missing = [dep for dep in REQUIRES.get(mod, []) if find_spec(dep) is None]
+        if missing:
+            print(f"{mod:<24} skipped (not installed: {', '.join(missing)})")
+        else:
+            modules.append(mod)
+    times, error = measure_import_times(modules)
+    ok = error is None
+    if error:
+        print(f"Import failed: {error}")
+    for mod in modules:
+        budget = STARTUP_BUDGET_MS[mod]
+        if mod not in times:
+            ok = False
+            print(f"{mod:<24} {'-':>8}     (budget {budget} ms)  NOT IMPORTED")
+            continue
+        took = times[mod]
+        status = 'ok' if took <= budget else 'OVER BUDGET'
+        ok = ok and took <= budget
+        print(f"{mod:<24} {took:8.1f} ms  (budget {budget} ms)  {status}")
+    eager = sorted({name.split('.')[0] for name in times} & set(LAZY_MODULES))
+    if eager:
+        ok = False
+        print(f"Imported eagerly at startup: {', '.join(eager)}")
+    return ok
+
+def run_reports(out_dir, users=None, workers=None, force=False) -> bool:
+    from modules import reports
+    try:
+        results = reports.generate_reports(out_dir, users=users, include_default=not users,
+                                           max_workers=workers, force=force)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return False
+    failed = False
+    for r in results:
+        print(f"{r['user']:<20} rendered {len(r['rendered']):4d}  unchanged {r['skipped']:4d}  removed {len(r['removed']):4d}")
+        for month, err in r['errors'].items():
+            failed = True
+            print(f"  {month}: {err}")
+    return not failed
+
+def run_api_load_test(url=None, users=None, clients=8, batch=20, keep_data=False):
+    from modules import loadtest
+    user = users[0] if users else loadtest.LOADTEST_USER
+    print(f"Posting to {url or 'a local server'} as user '{user}' ({clients} clients, {batch} rows per request)")
+    r = loadtest.api_load_test(url, clients=clients, batch_size=batch, user=user, keep_data=keep_data)
+    lat = r['latency_ms']
+    print(f"rows added     {r['rows']:10d}  in {r['seconds']:.2f} s  ({r['rows_per_second']:.0f} rows/s)")
+    print(f"requests       {r['requests']:10d}  errors {r['errors']}")
+    print(f"latency (ms)   p50 {lat['p50']:.1f}  p95 {lat['p95']:.1f}  p99 {lat['p99']:.1f}  max {lat['max']:.1f}")
+    print(f"group commits  {r['commits']:10d}  ({r['rows_per_commit']:.1f} rows per commit)")
+    if r['data_dir']:
+        print(f"scratch data   {r['data_dir']}")
+    return r['errors'] == 0
+
+def run_ui_load_test(sessions=4, reruns=10, rows=5000, threads=False, switch_users=False, keep_data=False) -> bool:
+    from modules import loadtest
+    mode = 'threads in this process' if threads else 'processes'
+    print(f"Running {sessions} concurrent app sessions ({mode}) x {reruns} actions on a {rows}-row scratch ledger")
+    r = loadtest.streamlit_load_test(sessions=sessions, reruns=reruns, rows=rows, threads=threads,
+                                     switch_users=switch_users, keep_data=keep_data)
+    lat = r['latency_ms']
+    print(f"reruns         {r['reruns']:10d}  in {r['seconds']:.2f} s  ({r['reruns_per_second']:.1f} reruns/s)")
+    print(f"latency (ms)   p50 {lat['p50']:.1f}  p95 {lat['p95']:.1f}  p99 {lat['p99']:.1f}  max {lat['max']:.1f}")
+    print("actions        " + '  '.join(f"{k} {v}" for k, v in sorted(r['actions'].items())))
+    if r['io']:
+        print(f"file I/O       read {r['io']['rchar'] / 1e6:.1f} MB in {r['io']['syscr']} calls, "
+              f"wrote {r['io']['wchar'] / 1e6:.1f} MB in {r['io']['syscw']} calls")
+    if r['data_dir']:
+        print(f"scratch data   {r['data_dir']}")
+    for e in r['errors']:
+        print(f"ERROR      {e}")
+    for v in r['violations']:
+        print(f"VIOLATION  {v}")
+    return not r['errors'] and not r['violations']
+
+def launch_streamlit():
+    # Run Streamlit in this interpreter instead of spawning a second one, which
+    # would pay the whole Python + Streamlit import cost again.
+    from streamlit.web import cli as stcli
+    sys.argv = ['streamlit', 'run', APP_PATH]
+    return stcli.main()
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Personal Finance Tracker')
+    parser.add_argument('--startup-check', action='store_true',
+                        help='measure module import times against the startup budget and exit')
+    parser.add_argument('--report', action='store_true',
+                        help='render monthly charts and PDF statements for every user and exit')
+    parser.add_argument('--out', default=os.path.join(BASE_DIR, 'reports'),
+                        help='output directory for --report (default: reports/)')
+    parser.add_argument('--user', action='append', dest='users',
+                        help='limit --report to this user (repeatable); ledger for --load-test')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes for --report (default: CPU count)')
+    parser.add_argument('--force', action='store_true',
+                        help='re-render every month even if its data is unchanged')
+    parser.add_argument('--serve', action='store_true',
+                        help='run the local HTTP ingestion API instead of the UI')
+    parser.add_argument('--host', default='127.0.0.1', help='address for --serve')
+    parser.add_argument('--port', type=int, default=8765, help='port for --serve')
+    parser.add_argument('--load-test', action='store_true',
+                        help='measure ingest throughput of the HTTP API and exit '
+                             '(without --url: a local instance on a scratch data directory)')
+    parser.add_argument('--url', default=None,
+                        help='API to load-test (default: start a local instance)')
+    parser.add_argument('--clients', type=int, default=8, help='concurrent clients for --load-test')
+    parser.add_argument('--batch', type=int, default=20, help='rows per request for --load-test')
+    parser.add_argument('--ui-load-test', action='store_true',
+                        help='run concurrent scripted Streamlit sessions on a scratch ledger and exit')
+    parser.add_argument('--sessions', type=int, default=4, help='concurrent sessions for --ui-load-test')
+    parser.add_argument('--reruns', type=int, default=10, help='actions per session for --ui-load-test')
+    parser.add_argument('--rows', type=int, default=5000, help='synthetic ledger size for --ui-load-test')
+    parser.add_argument('--threads', action='store_true',
+                        help='run --ui-load-test sessions as threads sharing one process, as Streamlit does')
+    parser.add_argument('--switch-users', action='store_true',
+                        help='let --threads sessions switch between their own user and the default ledger')
+    parser.add_argument('--keep-data', action='store_true',
+                        help='keep the scratch data directory of --load-test / --ui-load-test')
+    args = parser.parse_args()
+    if args.startup_check:
+        sys.exit(0 if startup_check() else 1)
+    if args.report:
+        sys.exit(0 if run_reports(args.out, args.users, args.workers, args.force) else 1)
+    if args.load_test:
+        sys.exit(0 if run_api_load_test(args.url, args.users, args.clients, args.batch, args.keep_data) else 1)
+    if args.ui_load_test:
+        sys.exit(0 if run_ui_load_test(args.sessions, args.reruns, args.rows, args.threads,
+                                       args.switch_users, args.keep_data) else 1)
+    if args.serve:
+        from modules import api
+        api.serve(args.host, args.port)
+        sys.exit(0)
     print("\n==============================")
     print(" Welcome to Personal Finance Tracker! ")
     print("==============================\n")
@@ -23,6 +210,6 @@ if __name__ == '__main__':
     if not check_files():
         sys.exit(1)
     try:
-        subprocess.run([sys.executable, '-m', 'streamlit', 'run', 'modules/streamlit_app.py'], check=True)
+        launch_streamlit()
     except Exception as e:
-        print(f"Error launching Streamlit: {e}")
\ No newline at end of file
+        print(f"Error launching Streamlit: {e}")
@@ -0,0 +1,101 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from typing import Optional, List, Dict
+import pandas as pd
+from modules import data_handler
+
+# Cross-user rollups. Each ledger is read and reduced to a small partial
+# aggregate in a worker process; the parent only merges the partials.
+
+DEFAULT_USER = 'default'
+
+def ledger_targets(users: Optional[List[str]], include_default: bool) -> List[Optional[str]]:
+    """The ledgers to process: users (default: every ledger on disk), with
+    None for the shared default ledger first when include_default is set.
+
+    The default ledger is reported as DEFAULT_USER, so a real user of that name
+    would share its report directory and summary row; that is refused.
+    """
+    if users is None:
+        users = data_handler.list_users()
+    targets: List[Optional[str]] = list(users)
+    if include_default:
+        if DEFAULT_USER in targets:
+            raise ValueError(f"user '{DEFAULT_USER}' clashes with the default ledger; "
+                             "rename it or leave the default ledger out")
+        targets.insert(0, None)
+    return targets
+
+def parallel_map(func, tasks: list, max_workers: Optional[int] = None) -> list:
+    """list(map(func, tasks)) over a process pool (in this process when only
+    one worker or task). func must be a module-level function."""
+    workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        return [func(t) for t in tasks]
+    chunksize = max(1, len(tasks) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(func, tasks, chunksize=chunksize))
+
+def _user_partial(user: Optional[str]) -> Dict:
+    """Summarise one user's ledger (runs inside a worker process)."""
+    with data_handler.as_user(user):
+        df = data_handler.read_ledger()
+        currency, precision = data_handler.get_currency()
+    name = user or DEFAULT_USER
+    # Amounts are summed as integer minor units and only then turned into
+    # Decimals, so ledgers with different precisions still merge exactly.
+    to_dec = lambda minor: data_handler.to_decimal(minor, precision)
+    if df.empty:
+        return {'user': name, 'currency': currency, 'income': to_dec(0), 'expense': to_dec(0),
+                'transactions': 0, 'monthly': pd.DataFrame(columns=['month', 'income', 'expense'])}
+    income = int(df.loc[df['type'] == 'income', 'amount'].sum())
+    expense = int(df.loc[df['type'] == 'expense', 'amount'].sum())
+    df['month'] = pd.to_datetime(df['date']).dt.to_period('M').astype(str)
+    monthly = df.groupby(['month', 'type'])['amount'].sum().unstack(fill_value=0)
+    monthly = monthly.reindex(columns=['income', 'expense'], fill_value=0)
+    monthly = monthly.apply(lambda col: col.map(to_dec)).reset_index()
+    return {'user': name, 'currency': currency, 'income': to_dec(income), 'expense': to_dec(expense),
+            'transactions': len(df), 'monthly': monthly}
+
+def _merge_partials(partials: List[Dict]) -> Dict:
+    # Amounts in different currencies are never added together: every
+    # cross-user total is grouped by currency.
+    fields = ['user', 'currency', 'income', 'expense', 'transactions']
+    summary = pd.DataFrame([{k: p[k] for k in fields} for p in partials], columns=fields).set_index('user')
+    summary['savings'] = summary['income'] - summary['expense']
+    frames = [p['monthly'].assign(user=p['user'], currency=p['currency'])
+              for p in partials if not p['monthly'].empty]
+    if frames:
+        monthly = pd.concat(frames, ignore_index=True)[['user', 'currency', 'month', 'income', 'expense']]
+        monthly['savings'] = monthly['income'] - monthly['expense']
+        combined_monthly = monthly.groupby(['currency', 'month'])[['income', 'expense', 'savings']].sum()
+    else:
+        monthly = pd.DataFrame(columns=['user', 'currency', 'month', 'income', 'expense', 'savings'])
+        combined_monthly = pd.DataFrame(columns=['income', 'expense', 'savings'],
+                                        index=pd.MultiIndex.from_arrays([[], []], names=['currency', 'month']))
+    combined = {}
+    for currency, group in summary.groupby('currency'):
+        income = sum(group['income'], Decimal(0))
+        expense = sum(group['expense'], Decimal(0))
+        combined[currency] = (income, expense, income - expense)
+    return {
+        'summary': summary,
+        'combined': combined,
+        'monthly': monthly,
+        'combined_monthly': combined_monthly,
+    }
+
+def household_rollup(users: Optional[List[str]] = None, include_default: bool = False,
+                     max_workers: Optional[int] = None) -> Dict:
+    """Aggregate several user ledgers in parallel.
+
+    users defaults to every ledger found by data_handler.list_users(); the
+    shared default ledger is added when include_default is set. Returns a dict
+    with 'summary' (per-user currency and income/expense/savings), 'combined'
+    (currency -> an exact (income, expense, savings) tuple like get_summary),
+    'monthly' (per user and month) and 'combined_monthly' (per currency and
+    month across all users).
+    """
+    partials = parallel_map(_user_partial, ledger_targets(users, include_default), max_workers)
+    return _merge_partials(partials)
\ No newline at end of file
@@ -0,0 +1,252 @@
+import os
+import re
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from typing import Optional, List, Dict
+import pandas as pd
+from modules import data_handler
+
+# Local HTTP API around data_handler for scripts (bank sync, imports).
+#
+#   POST /transactions          one transaction object, a list of them, or
+#                               {"transactions": [...]}; ?skip_duplicates=1
+#   GET  /transactions          paged query: start, end, category, type,
+#                               offset, limit
+#   GET  /summary               income / expense / savings
+#   GET  /trends                monthly totals per category: start, end
+#   GET  /stats                 ingest counters
+#
+# Every endpoint takes ?user=<name> for a per-user ledger; GETs for a user
+# without one are answered 404, and POSTs create it. Posted rows are not
+# written by the request thread: they are queued, and a single writer thread
+# commits everything that arrives within BATCH_WINDOW seconds (or up to
+# BATCH_MAX_ROWS rows) with one add_transactions() call per user, then answers
+# each request with its own share of the result. API writes are not recorded on
+# the ledger's undo stack, which belongs to the interactive user. data_handler
+# keeps its caches in module globals, so every call into it is made under
+# _LEDGER_LOCK; other processes writing the same ledger (the app, reports) are
+# kept out by data_handler's own per-ledger file lock.
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+BATCH_WINDOW = 0.02
+BATCH_MAX_ROWS = 5000
+PAGE_LIMIT = 1000
+_USER_RE = re.compile(r'[A-Za-z0-9_-]{1,64}')
+_LEDGER_LOCK = threading.Lock()
+
+class _Pending:
+    """One POST waiting for its group commit."""
+    def __init__(self, user: Optional[str], rows: List[dict], skip_duplicates: bool):
+        self.user = user
+        self.rows = rows
+        self.skip_duplicates = skip_duplicates
+        self.added = 0
+        self.rejected: List[dict] = []
+        self.error: Optional[str] = None
+        self.done = threading.Event()
+
+class GroupCommitter:
+    """Coalesces queued rows into batched ledger writes on a writer thread."""
+
+    def __init__(self, window: float = BATCH_WINDOW, max_rows: int = BATCH_MAX_ROWS):
+        self.window = window
+        self.max_rows = max_rows
+        self.stats = {'requests': 0, 'rows': 0, 'commits': 0, 'commit_seconds': 0.0}
+        self._queue: List[_Pending] = []
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='group-commit', daemon=True)
+        self._thread.start()
+
+    def submit(self, user: Optional[str], rows: List[dict], skip_duplicates: bool = False) -> _Pending:
+        """Queue rows and block until the batch containing them is committed."""
+        pending = _Pending(user, rows, skip_duplicates)
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError('server is shutting down')
+            self._queue.append(pending)
+            self._cond.notify_all()
+        pending.done.wait()
+        return pending
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _queued_rows(self) -> int:
+        return sum(len(p.rows) for p in self._queue)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopped:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                # The first request opens a window; later ones join the batch
+                # until it closes or grows past max_rows.
+                deadline = time.monotonic() + self.window
+                while not self._stopped and self._queued_rows() < self.max_rows:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._queue = self._queue, []
+            self._commit(batch)
+
+    def _commit(self, batch: List[_Pending]):
+        started = time.perf_counter()
+        groups: Dict[tuple, List[_Pending]] = {}
+        for p in batch:
+            groups.setdefault((p.user, p.skip_duplicates), []).append(p)
+        for (user, skip_duplicates), pendings in groups.items():
+            rows = [r for p in pendings for r in p.rows]
+            try:
+                with _LEDGER_LOCK, data_handler.as_user(user):
+                    data_handler.init_db()
+                    _, rejected = data_handler.add_transactions(rows, skip_duplicates=skip_duplicates,
+                                                                record_undo=False)
+                # Rejected rows keep their position in the combined batch.
+                offset = 0
+                for p in pendings:
+                    mine = rejected[(rejected.index >= offset) & (rejected.index < offset + len(p.rows))]
+                    p.rejected = _records(mine.assign(index=mine.index - offset))
+                    p.added = len(p.rows) - len(mine)
+                    offset += len(p.rows)
+            except Exception as e:
+                for p in pendings:
+                    p.error = str(e)
+            self.stats['commits'] += 1
+        self.stats['requests'] += len(batch)
+        self.stats['rows'] += sum(p.added for p in batch)
+        self.stats['commit_seconds'] += time.perf_counter() - started
+        for p in batch:
+            p.done.set()
+
+def _records(df: pd.DataFrame) -> List[dict]:
+    return json.loads(df.to_json(orient='records'))
+
+def _transactions_page(params: Dict[str, str]) -> dict:
+    df = data_handler.get_transactions(params.get('start'), params.get('end'))
+    if params.get('category'):
+        df = df[df['category'] == params['category']]
+    if params.get('type'):
+        df = df[df['type'] == params['type']]
+    offset = max(int(params.get('offset', 0)), 0)
+    limit = min(max(int(params.get('limit', 100)), 0), PAGE_LIMIT)
+    page = df.iloc[offset:offset + limit]
+    return {'total': len(df), 'offset': offset, 'limit': limit,
+            'items': _records(page.reset_index())}
+
+def _summary() -> dict:
+    income, expense, savings = data_handler.get_summary()
+    return {'currency': data_handler.get_currency()[0], 'income': str(income),
+            'expense': str(expense), 'savings': str(savings)}
+
+def _trends(params: Dict[str, str]) -> dict:
+    trends = data_handler.monthly_trends(params.get('start'), params.get('end'))
+    return {str(month): {c: round(float(v), 10) for c, v in row.items()} for month, row in trends.iterrows()}
+
+class _Handler(BaseHTTPRequestHandler):
+    committer: GroupCommitter = None
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _params(self) -> Dict[str, str]:
+        return {k: v[-1] for k, v in parse_qs(urlparse(self.path).query).items()}
+
+    def _user(self, params: Dict[str, str]) -> Optional[str]:
+        user = params.get('user')
+        if user and not _USER_RE.fullmatch(user):
+            raise ValueError('invalid user name')
+        return user or None
+
+    def _send(self, status: int, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        route = urlparse(self.path).path.rstrip('/')
+        try:
+            params = self._params()
+            if route == '/stats':
+                return self._send(200, self.committer.stats)
+            views = {'/transactions': lambda: _transactions_page(params),
+                     '/summary': _summary,
+                     '/trends': lambda: _trends(params)}
+            if route not in views:
+                return self._send(404, {'error': 'not found'})
+            user = self._user(params)
+            with _LEDGER_LOCK, data_handler.as_user(user):
+                # Reads never create a ledger; an unknown user is a 404.
+                if user and not os.path.exists(data_handler._user_paths()[0]):
+                    return self._send(404, {'error': f'no ledger for user {user!r}'})
+                payload = views[route]()
+            self._send(200, payload)
+        except ValueError as e:
+            self._send(400, {'error': str(e)})
+        except Exception as e:
+            self._send(500, {'error': str(e)})
+
+    def do_POST(self):
+        route = urlparse(self.path).path.rstrip('/')
+        if route != '/transactions':
+            return self._send(404, {'error': 'not found'})
+        try:
+            params = self._params()
+            user = self._user(params)
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'null')
+            if isinstance(payload, dict):
+                payload = payload.get('transactions', [payload])
+            if not isinstance(payload, list) or not all(isinstance(r, dict) for r in payload):
+                raise ValueError('expected a transaction object or a list of them')
+        except ValueError as e:
+            return self._send(400, {'error': str(e)})
+        skip = params.get('skip_duplicates', '').lower() in ('1', 'true', 'yes')
+        pending = self.committer.submit(user, payload, skip)
+        if pending.error:
+            return self._send(500, {'error': pending.error})
+        self._send(200, {'added': pending.added, 'rejected': pending.rejected})
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Bursts of concurrent clients are the point; the default backlog is 5.
+    request_queue_size = 128
+
+def make_server(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, window: float = BATCH_WINDOW,
+                max_rows: int = BATCH_MAX_ROWS) -> ThreadingHTTPServer:
+    """Build the API server (port 0 picks a free port). Call serve_forever(),
+    and stop_server() when done."""
+    committer = GroupCommitter(window, max_rows)
+    handler = type('Handler', (_Handler,), {'committer': committer})
+    server = _Server((host, port), handler)
+    server.committer = committer
+    return server
+
+def stop_server(server: ThreadingHTTPServer):
+    server.shutdown()
+    server.server_close()
+    server.committer.stop()
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+    server = make_server(host, port)
+    print(f"Serving the ledger API on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_server(server)
@@ -1,8 +1,20 @@
 import os
 import json
+import hashlib
+import functools
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime, date, timedelta
-from typing import Optional, List, Dict
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Optional, List, Dict, Tuple
+import numpy as np
 import pandas as pd
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
 
 # Paths and defaults
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
@@ -11,45 +23,971 @@ JSON_PATH = os.path.join(BASE_DIR, 'data.json')
 CATEGORIES_PATH = os.path.join(BASE_DIR, 'categories.json')
 UNDO_PATH = os.path.join(BASE_DIR, 'undo.json')
 RECURRING_PATH = os.path.join(BASE_DIR, 'recurring.json')
+BUDGETS_PATH = os.path.join(BASE_DIR, 'budgets.json')
+BUDGET_PERIODS = ['monthly', 'weekly']
 COLUMNS = ['date', 'amount', 'category', 'type']
+TYPES = ['income', 'expense']
+# Amounts are stored as integer minor units (e.g. cents) of the ledger's
+# currency; the currency and its precision live in a sidecar <ledger>.meta.json.
+# On disk the amount column is headed 'amount_minor', so every file records its
+# own format and an 'amount' header means float amounts from before the change.
+DEFAULT_CURRENCY = 'USD'
+DEFAULT_PRECISION = 2
+AMOUNT_HEADER = 'amount_minor'
 
-# Per-user support: switch filenames when set
+# Per-user support: switch filenames when set. The user is kept per thread:
+# a Streamlit server runs every session's script on its own thread, and one
+# session switching user must not move another session's reads and writes to
+# a different ledger. _CURRENT_USER is the last user set in any thread and is
+# used by threads that never chose one.
 _CURRENT_USER: Optional[str] = None
+_THREAD_USER = threading.local()
+
+def current_user() -> Optional[str]:
+    """The user whose ledger this thread reads and writes (None: default)."""
+    return getattr(_THREAD_USER, 'name', _CURRENT_USER)
 
 def _user_paths():
-    if _CURRENT_USER:
-        return (os.path.join(BASE_DIR, f'data_{_CURRENT_USER}.csv'),
-                os.path.join(BASE_DIR, f'data_{_CURRENT_USER}.json'))
+    user = current_user()
+    if user:
+        return (os.path.join(BASE_DIR, f'data_{user}.csv'),
+                os.path.join(BASE_DIR, f'data_{user}.json'))
     return (CSV_PATH, JSON_PATH)
 
 def set_user(username: Optional[str]):
     """Set current user (simple per-user file switching)."""
     global _CURRENT_USER
     _CURRENT_USER = username
+    _THREAD_USER.name = username
+
+@contextmanager
+def as_user(username: Optional[str]):
+    """Switch this thread to a user's ledger for the duration of a with block."""
+    had_user = hasattr(_THREAD_USER, 'name')
+    previous = current_user()
+    _THREAD_USER.name = username
+    try:
+        yield
+    finally:
+        if had_user:
+            _THREAD_USER.name = previous
+        else:
+            del _THREAD_USER.name
+
+def set_data_dir(path: str):
+    """Keep all ledgers and settings in another directory (e.g. a scratch
+    copy for load tests). Cached indexes and mapped mirrors are dropped."""
+    global BASE_DIR, CSV_PATH, JSON_PATH, CATEGORIES_PATH, UNDO_PATH, RECURRING_PATH, BUDGETS_PATH
+    BASE_DIR = os.path.abspath(path)
+    CSV_PATH = os.path.join(BASE_DIR, 'data.csv')
+    JSON_PATH = os.path.join(BASE_DIR, 'data.json')
+    CATEGORIES_PATH = os.path.join(BASE_DIR, 'categories.json')
+    UNDO_PATH = os.path.join(BASE_DIR, 'undo.json')
+    RECURRING_PATH = os.path.join(BASE_DIR, 'recurring.json')
+    BUDGETS_PATH = os.path.join(BASE_DIR, 'budgets.json')
+    for cache, _, _ in _INDEXES.values():
+        cache.clear()
+    _MAPPED.clear()
+
+def list_users() -> List[str]:
+    """Return the names of all users that have a per-user ledger on disk."""
+    users = []
+    for fname in sorted(os.listdir(BASE_DIR)):
+        if fname.startswith('data_') and fname.endswith('.csv'):
+            users.append(fname[len('data_'):-len('.csv')])
+    return users
+
+# Ledger lock. Every change is a read-modify-write of partition files, the
+# manifest, the undo stack and the import refs, and the app, the API server
+# and report runs may be separate processes on the same ledger. Writers hold
+# a per-ledger lock for the whole change: a threading lock for this process
+# plus an OS lock on <ledger>.lock for the others. It is re-entrant within a
+# thread, so locked functions can call each other.
+_LOCKS: Dict[str, dict] = {}
+_LOCKS_GUARD = threading.Lock()
+
+def _lock_path(csvp: str) -> str:
+    return os.path.splitext(csvp)[0] + '.lock'
+
+def _lock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        return
+    while True:
+        try:
+            # Locks the first byte; LK_LOCK gives up after ~10 s, so retry.
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue
+
+def _unlock_file(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+@contextmanager
+def _ledger_lock(csvp: str):
+    with _LOCKS_GUARD:
+        state = _LOCKS.setdefault(csvp, {'lock': threading.RLock(), 'depth': 0, 'file': None})
+    with state['lock']:
+        if not state['depth']:
+            f = open(_lock_path(csvp), 'a+b')
+            try:
+                f.seek(0)
+                _lock_file(f)
+            except Exception:
+                f.close()
+                raise
+            state['file'] = f
+        state['depth'] += 1
+        try:
+            yield
+        finally:
+            state['depth'] -= 1
+            if not state['depth']:
+                f, state['file'] = state['file'], None
+                try:
+                    _unlock_file(f)
+                finally:
+                    f.close()
+
+def _locked(func):
+    """Run func holding the current ledger's lock. The thread stays on that
+    ledger for the whole call, so every path func looks up is the locked one."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with as_user(current_user()), _ledger_lock(_user_paths()[0]):
+            return func(*args, **kwargs)
+    return wrapper
+
+def _locked_path(func):
+    """Run func(csvp, ...) holding the lock of the ledger at csvp."""
+    @functools.wraps(func)
+    def wrapper(csvp, *args, **kwargs):
+        with _ledger_lock(csvp):
+            return func(csvp, *args, **kwargs)
+    return wrapper
 
 def init_db():
-    csvp, _ = _user_paths()
+    _create_ledger(_user_paths()[0])
+
+def _create_ledger(csvp: str):
     if not os.path.exists(csvp):
-        pd.DataFrame(columns=COLUMNS).to_csv(csvp, index=False)
+        _write_csv(csvp, _empty_df())
+        if _load_meta(csvp) is None:
+            _save_meta(csvp, {'currency': DEFAULT_CURRENCY, 'precision': DEFAULT_PRECISION})
+
+def _empty_df() -> pd.DataFrame:
+    df = pd.DataFrame(columns=COLUMNS)
+    df['amount'] = df['amount'].astype('int64')
+    return df
+
+def _meta_path(csvp: str) -> str:
+    return os.path.splitext(csvp)[0] + '.meta.json'
+
+def _load_meta(csvp: str) -> Optional[dict]:
+    try:
+        with open(_meta_path(csvp), 'r') as f:
+            meta = json.load(f)
+        if isinstance(meta, dict):
+            return meta
+    except Exception:
+        pass
+    return None
 
-def _read_df() -> pd.DataFrame:
+def _save_meta(csvp: str, meta: dict):
+    with open(_meta_path(csvp), 'w') as f:
+        json.dump(meta, f)
+
+def get_currency() -> Tuple[str, int]:
+    """(currency, precision) of the current ledger, e.g. ('USD', 2)."""
     csvp, _ = _user_paths()
-    if not os.path.exists(csvp):
-        init_db()
+    meta = _load_meta(csvp) or {}
+    return meta.get('currency', DEFAULT_CURRENCY), int(meta.get('precision', DEFAULT_PRECISION))
+
+@_locked
+def set_currency(currency: str, precision: Optional[int] = None):
+    """Set the ledger currency; changing the precision rescales stored amounts
+    and is refused if that would lose digits."""
+    csvp, _ = _user_paths()
+    _, old_precision = get_currency()
+    precision = old_precision if precision is None else int(precision)
+    if precision < 0:
+        raise ValueError('precision must be >= 0')
+    if precision > old_precision:
+        factor = 10 ** (precision - old_precision)
+        _rewrite_all(csvp, lambda df: df.assign(amount=df['amount'] * factor))
+    elif precision < old_precision:
+        factor = 10 ** (old_precision - precision)
+        if any((f['amount'].to_numpy() % factor).any() for f in ledger_frames()):
+            raise ValueError('amounts have more decimals than the new precision')
+        _rewrite_all(csvp, lambda df: df.assign(amount=df['amount'] // factor))
+    _save_meta(csvp, {'currency': currency, 'precision': precision})
+
+def _to_minor(amount, precision: int) -> int:
+    """Validate one amount and convert it to integer minor units."""
+    try:
+        value = Decimal(str(amount).strip())
+        minor = int((value * 10 ** precision).to_integral_value(rounding=ROUND_HALF_UP))
+    except Exception:
+        raise ValueError('amount must be a number > 0')
+    if minor <= 0 or minor >= 2 ** 63:
+        raise ValueError('amount must be a number > 0')
+    return minor
+
+def _parse_amounts(values, precision: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorised _to_minor for bulk paths: (int64 minor units, valid mask)."""
+    num = pd.to_numeric(pd.Series(values, dtype=object).astype(str).str.strip(), errors='coerce').to_numpy(dtype=float)
+    with np.errstate(invalid='ignore', over='ignore'):
+        # Round the scaled value first so 1.005 -> 100.49999.. still rounds
+        # half-up to 101, matching the exact Decimal path.
+        scaled = np.round(num * 10 ** precision, 6)
+        minor = np.floor(scaled + 0.5)
+        valid = np.isfinite(minor) & (minor > 0) & (minor < 2 ** 53)
+    return np.where(valid, minor, 0).astype('int64'), valid
+
+def to_decimal(minor, precision: int) -> Decimal:
+    return Decimal(int(minor)).scaleb(-precision)
+
+def _fingerprint(date: str, amount: int, category: str, t_type: str) -> int:
+    """64-bit fingerprint of a normalised row (date string, minor units).
+    Stable across processes, unlike hash(), so it can be stored on disk."""
+    key = f'{date}|{int(amount)}|{category}|{t_type}'.encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little')
+
+def _fingerprints(df: pd.DataFrame) -> np.ndarray:
+    """_fingerprint of every row of a normalised frame, as uint64."""
+    if df.empty:
+        return np.zeros(0, dtype='uint64')
+    rows = zip(df['date'].astype(str), df['amount'].astype('int64').tolist(), df['category'], df['type'])
+    return np.fromiter((_fingerprint(*r) for r in rows), dtype='uint64', count=len(df))
+
+def _is_legacy(csvp: str) -> bool:
+    """True for a ledger still in the float format: its file has an 'amount'
+    header and no meta sidecar. (Files written in minor units before the
+    header change have a sidecar and get the new header on their next write.)"""
+    if not os.path.getsize(csvp):
+        return _load_meta(csvp) is None
+    with open(csvp, 'r', newline='') as f:
+        header = f.readline().strip().split(',')
+    return AMOUNT_HEADER not in header and _load_meta(csvp) is None
+
+def _migrate_legacy(csvp: str) -> pd.DataFrame:
+    """Convert a ledger written with float amounts to integer minor units.
+    The original file is kept next to it as <ledger>.csv.bak."""
+    if os.path.isdir(_parts_dir(csvp)):
+        # Only ledgers already in minor units have partitions; converting one
+        # again would multiply every amount by 10 ** precision.
+        raise ValueError(f'{csvp} has no {AMOUNT_HEADER!r} header or {_meta_path(csvp)} but has '
+                         f'partitions; restore the meta file instead of migrating it again')
+    df = pd.read_csv(csvp) if os.path.getsize(csvp) else _empty_df()
+    if not df.empty:
+        minor, valid = _parse_amounts(df['amount'], DEFAULT_PRECISION)
+        if not valid.all():
+            raise ValueError(f'{csvp} has invalid amounts; fix them before opening the ledger')
+        with open(csvp, 'rb') as src, open(csvp + '.bak', 'wb') as dst:
+            dst.write(src.read())
+        df['amount'] = minor
+    else:
+        df = _empty_df()
+    _write_csv(csvp, df)
+    _save_meta(csvp, {'currency': DEFAULT_CURRENCY, 'precision': DEFAULT_PRECISION})
+    return df
+
+def _read_csv(path: str) -> pd.DataFrame:
+    """Read one partition file. A file that cannot be parsed (e.g. a
+    hand-edited row with a decimal amount) raises instead of reading as empty,
+    so no write ever rewrites a partition from a failed read."""
+    if not os.path.getsize(path):
+        return _empty_df()
     try:
-        return pd.read_csv(csvp)
+        df = pd.read_csv(path, dtype={AMOUNT_HEADER: 'int64', 'amount': 'int64'})
+    except Exception as e:
+        raise ValueError(f'{path} could not be read ({e}); fix or restore it before using the ledger') from e
+    df = df.rename(columns={AMOUNT_HEADER: 'amount'})
+    missing = [c for c in COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f'{path} is missing columns {missing}; fix or restore it before using the ledger')
+    return df
+
+def _write_csv(path: str, df: pd.DataFrame):
+    """Write a partition file atomically, so a failed write leaves the old one."""
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        df.rename(columns={'amount': AMOUNT_HEADER}).to_csv(
+            tmp, index=False, compression='gzip' if path.endswith('.gz') else None)
+        os.replace(tmp, path)
     except Exception:
-        return pd.DataFrame(columns=COLUMNS)
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def _decode_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """Turn a columnar frame back into the row layout (date strings, names)."""
+    if not len(frame):
+        return _empty_df()
+    categories = np.asarray(frame.attrs['categories'], dtype=object)
+    types = np.asarray(frame.attrs['types'], dtype=object)
+    # Format each distinct day once; ledgers have far fewer days than rows.
+    days, pos = np.unique(frame['day'].to_numpy(), return_inverse=True)
+    dates = np.datetime_as_string(days.astype('datetime64[D]')).astype(object)
+    return pd.DataFrame({
+        'date': dates[pos],
+        'amount': frame['amount'].to_numpy(dtype='int64', copy=True),
+        'category': categories[frame['category'].to_numpy()],
+        'type': types[frame['type'].to_numpy()],
+    }, columns=COLUMNS, index=frame.index)
+
+def read_ledger(start=None, end=None) -> pd.DataFrame:
+    """The raw ledger, amounts as int64 minor units.
+
+    With start/end (inclusive dates) only the partitions overlapping that range
+    are read and rows outside it are dropped. The index always holds each
+    row's position in the whole ledger, as used by edit/delete_transaction.
+    """
+    frames = ledger_frames(start, end)
+    # Each partition decodes with its own category/type dictionary.
+    df = _decode_frame(frames[0]) if len(frames) == 1 else pd.concat([_decode_frame(f) for f in frames])
+    if (start is not None or end is not None) and not df.empty:
+        day = pd.to_datetime(df['date'])
+        if start is not None:
+            df = df[day >= pd.Timestamp(start).normalize()]
+            day = day[df.index]
+        if end is not None:
+            df = df[day <= pd.Timestamp(end).normalize()]
+    return df
+
+# Columnar mirror: each partition file has a <partition>.cols next to it with
+# a small JSON header followed by fixed-width columns (date as int32 days since
+# 1970-01-01, amount as int64 minor units, category and type as small integer
+# codes, and the row's duplicate-detection fingerprint). Readers memory-map it,
+# so opening the ledger needs no parsing and every process reading the same
+# ledger shares one page-cache copy. The CSV
+# stays the source of truth: the header records the stamp of the file the
+# mirror was built from, and a reader that finds it stale rebuilds it.
+COLS_MAGIC = b'PFTCOLS2'
+_COLUMN_DTYPES = [('day', 'int32'), ('amount', 'int64'), ('category', 'uint16'), ('type', 'uint8'),
+                  ('fingerprint', 'uint64')]
+# Each mapping holds an open file descriptor, so only the most recently used
+# MAX_MAPPED mirrors stay cached (least recently used evicted first).
+MAX_MAPPED = 32
+_MAPPED: 'OrderedDict[str, tuple]' = OrderedDict()
 
-def _write_df(df: pd.DataFrame):
+def _cols_path(csvp: str) -> str:
+    return os.path.splitext(csvp)[0] + '.cols'
+
+def _pad8(n: int) -> int:
+    return (n + 7) // 8 * 8
+
+def _columns_from_df(df: pd.DataFrame) -> Tuple[Dict[str, np.ndarray], list, list]:
+    if df.empty:
+        return {name: np.zeros(0, dtype=dt) for name, dt in _COLUMN_DTYPES}, [], []
+    cat_codes, categories = pd.factorize(df['category'], sort=True)
+    type_codes, types = pd.factorize(df['type'], sort=True)
+    arrays = {
+        'day': pd.to_datetime(df['date']).values.astype('datetime64[D]').astype('int32'),
+        'amount': df['amount'].to_numpy(dtype='int64'),
+        'category': cat_codes.astype('uint16'),
+        'type': type_codes.astype('uint8'),
+        'fingerprint': _fingerprints(df),
+    }
+    return arrays, [str(c) for c in categories], [str(t) for t in types]
+
+def _frame_from_columns(arrays: Dict[str, np.ndarray], categories: list, types: list, stamp) -> pd.DataFrame:
+    # copy=False keeps each column a view of its array (each has its own dtype,
+    # so pandas does not consolidate them into a copied block).
+    frame = pd.DataFrame(arrays, columns=[name for name, _ in _COLUMN_DTYPES], copy=False)
+    frame.attrs.update(categories=categories, types=types, stamp=stamp)
+    return frame
+
+def _write_columns(path: str, df: pd.DataFrame, stamp):
+    """Rewrite a columnar mirror; failures only cost readers a CSV parse."""
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    try:
+        arrays, categories, types = _columns_from_df(df)
+        offsets, pos = {}, 0
+        for name, _ in _COLUMN_DTYPES:
+            offsets[name] = pos
+            pos += _pad8(arrays[name].nbytes)
+        header = json.dumps({'stamp': list(stamp), 'rows': len(df), 'categories': categories,
+                             'types': types, 'offsets': offsets}).encode('utf-8')
+        with open(tmp, 'wb') as f:
+            f.write(COLS_MAGIC)
+            f.write(np.uint64(len(header)).tobytes())
+            f.write(header.ljust(_pad8(len(header)), b' '))
+            for name, _ in _COLUMN_DTYPES:
+                data = arrays[name].tobytes()
+                f.write(data.ljust(_pad8(len(data)), b'\0'))
+        _MAPPED.pop(path, None)
+        # Readers that still map the old file keep a consistent snapshot.
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.remove(tmp)
+        except Exception:
+            pass
+
+def _map_columns(path: str) -> pd.DataFrame:
+    st = os.stat(path)
+    key = (st.st_ino, st.st_mtime_ns, st.st_size)
+    cached = _MAPPED.get(path)
+    if cached is not None and cached[0] == key:
+        _MAPPED.move_to_end(path)
+        return cached[1]
+    mm = np.memmap(path, dtype=np.uint8, mode='r')
+    if bytes(mm[:8]) != COLS_MAGIC:
+        raise ValueError(f'{path} is not a ledger column file')
+    hlen = int(np.frombuffer(mm, dtype=np.uint64, count=1, offset=8)[0])
+    header = json.loads(bytes(mm[16:16 + hlen]).decode('utf-8'))
+    base, rows = 16 + _pad8(hlen), header['rows']
+    arrays = {}
+    for name, dt in _COLUMN_DTYPES:
+        if rows:
+            arrays[name] = np.frombuffer(mm, dtype=dt, count=rows, offset=base + header['offsets'][name])
+        else:
+            arrays[name] = np.zeros(0, dtype=dt)
+    frame = _frame_from_columns(arrays, header['categories'], header['types'], tuple(header['stamp']))
+    _MAPPED[path] = (key, frame)
+    _MAPPED.move_to_end(path)
+    while len(_MAPPED) > MAX_MAPPED:
+        _MAPPED.popitem(last=False)
+    return frame
+
+def _partition_frame(csvp: str, key: str) -> pd.DataFrame:
+    """Columnar view of one partition, rebuilding its mirror when stale."""
+    src, cols = _partition_file(csvp, key), _partition_cols(csvp, key)
+    stamp = _ledger_stamp(src)
+    if stamp is None:
+        # The open partition of a ledger that has not been written yet.
+        return _frame_from_columns(*_columns_from_df(_empty_df()), None)
+    try:
+        frame = _map_columns(cols)
+        if frame.attrs['stamp'] == stamp:
+            return frame
+    except Exception:
+        pass
+    df = _read_csv(src)
+    _write_columns(cols, df, stamp)
+    try:
+        frame = _map_columns(cols)
+        if frame.attrs['stamp'] == stamp:
+            return frame
+    except Exception:
+        pass
+    # Mirror could not be written (e.g. read-only directory): in-memory columns.
+    return _frame_from_columns(*_columns_from_df(df), stamp)
+
+def _concat_frames(frames: List[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate partition frames, re-coding categories/types to a shared
+    dictionary. Copies, unlike a single-partition view."""
+    categories = sorted({c for f in frames for c in f.attrs['categories']})
+    types = sorted({t for f in frames for t in f.attrs['types']})
+    parts = []
+    for f in frames:
+        cat_map = np.array([categories.index(c) for c in f.attrs['categories']] or [0], dtype='uint16')
+        type_map = np.array([types.index(t) for t in f.attrs['types']] or [0], dtype='uint8')
+        parts.append(pd.DataFrame({'day': f['day'].to_numpy(), 'amount': f['amount'].to_numpy(),
+                                   'category': cat_map[f['category'].to_numpy()],
+                                   'type': type_map[f['type'].to_numpy()],
+                                   'fingerprint': f['fingerprint'].to_numpy()}, index=f.index))
+    frame = pd.concat(parts) if parts else _frame_from_columns(*_columns_from_df(_empty_df()), None)
+    frame.attrs.update(categories=categories, types=types, stamp=None)
+    return frame
+
+def ledger_frames(start=None, end=None) -> List[pd.DataFrame]:
+    """Read-only columnar views of the current ledger, one per partition.
+
+    Columns are 'day' (int32 days since 1970-01-01), 'amount' (int64 minor
+    units), 'category'/'type' (integer codes into the frame's own
+    attrs['categories'] / attrs['types']) and 'fingerprint' (uint64, see
+    _fingerprint); the index is the row position in the whole ledger.
+    start/end prune whole partitions only. The arrays are zero-copy views of
+    the memory-mapped .cols files, so per-partition loops never copy the
+    ledger; there is always at least one frame.
+    """
     csvp, _ = _user_paths()
-    df.to_csv(csvp, index=False)
+    manifest = _ledger_manifest(csvp)
+    offsets = _partition_offsets(manifest)
+    frames = []
+    for key in _partitions_in_range(manifest, start, end):
+        frame = _partition_frame(csvp, key)
+        if offsets[key]:
+            # Shallow copy: a new index over the same (memory-mapped) arrays.
+            frame = frame.copy(deep=False)
+            frame.index = pd.RangeIndex(offsets[key], offsets[key] + len(frame))
+        frames.append(frame)
+    return frames
+
+def ledger_frame(start=None, end=None) -> pd.DataFrame:
+    """ledger_frames() as a single frame. A zero-copy view when one partition
+    is involved; otherwise a concatenated copy with a shared category/type
+    dictionary (not cached), so hot paths use ledger_frames()."""
+    frames = ledger_frames(start, end)
+    return frames[0] if len(frames) == 1 else _concat_frames(frames)
+
+# Year partitions. The ledger CSV (data.csv / data_<user>.csv) is the open
+# partition: the current year and anything dated later. Each earlier year is a
+# closed partition, <ledger>.parts/<year>.csv.gz, compressed when the year is
+# closed and afterwards only rewritten if a back-dated change lands in it.
+# <ledger>.parts/manifest.json records per partition its row count, min/max
+# date and income/expense totals, so summaries come from the manifest and
+# date-bounded reads and writes open only the partitions they need.
+OPEN_PARTITION = 'open'
+
+def _parts_dir(csvp: str) -> str:
+    return os.path.splitext(csvp)[0] + '.parts'
+
+def _manifest_path(csvp: str) -> str:
+    return os.path.join(_parts_dir(csvp), 'manifest.json')
+
+def _partition_file(csvp: str, key: str) -> str:
+    if key == OPEN_PARTITION:
+        return csvp
+    return os.path.join(_parts_dir(csvp), f'{key}.csv.gz')
+
+def _partition_cols(csvp: str, key: str) -> str:
+    if key == OPEN_PARTITION:
+        return _cols_path(csvp)
+    return os.path.join(_parts_dir(csvp), f'{key}.cols')
+
+def _partition_keys(manifest: dict) -> List[str]:
+    """Partitions in ledger order: closed years ascending, then the open one."""
+    closed = sorted(k for k in manifest['partitions'] if k != OPEN_PARTITION)
+    return closed + [OPEN_PARTITION]
+
+def _partition_offsets(manifest: dict) -> Dict[str, int]:
+    offsets, pos = {}, 0
+    for key in _partition_keys(manifest):
+        offsets[key] = pos
+        pos += manifest['partitions'][key]['rows']
+    return offsets
+
+def _partitions_in_range(manifest: dict, start=None, end=None) -> List[str]:
+    lo = pd.Timestamp(start).strftime('%Y-%m-%d') if start is not None else None
+    hi = pd.Timestamp(end).strftime('%Y-%m-%d') if end is not None else None
+    keys = []
+    for key in _partition_keys(manifest):
+        entry = manifest['partitions'][key]
+        if key != OPEN_PARTITION and entry['rows'] == 0:
+            continue
+        if entry['rows'] and ((lo and entry['max_date'] < lo) or (hi and entry['min_date'] > hi)):
+            continue
+        keys.append(key)
+    return keys
+
+def _partition_key(dates: pd.Series, open_from: int) -> pd.Series:
+    years = pd.to_datetime(dates).dt.year
+    return years.where(years < open_from, -1).map(lambda y: OPEN_PARTITION if y == -1 else str(y))
+
+def _partition_entry(df: pd.DataFrame, stamp) -> dict:
+    if df.empty:
+        return {'rows': 0, 'min_date': None, 'max_date': None, 'income': 0, 'expense': 0,
+                'stamp': list(stamp) if stamp else None}
+    dates = pd.to_datetime(df['date'])
+    return {
+        'rows': len(df),
+        'min_date': dates.min().strftime('%Y-%m-%d'),
+        'max_date': dates.max().strftime('%Y-%m-%d'),
+        'income': int(df.loc[df['type'] == 'income', 'amount'].sum()),
+        'expense': int(df.loc[df['type'] == 'expense', 'amount'].sum()),
+        'stamp': list(stamp) if stamp else None,
+    }
+
+def _save_manifest(csvp: str, manifest: dict):
+    os.makedirs(_parts_dir(csvp), exist_ok=True)
+    tmp = f'{_manifest_path(csvp)}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp, _manifest_path(csvp))
+
+def _scan_manifest(csvp: str) -> dict:
+    """Rebuild the manifest from the partition files on disk."""
+    partitions = {}
+    parts = _parts_dir(csvp)
+    if os.path.isdir(parts):
+        for fname in os.listdir(parts):
+            if fname.endswith('.csv.gz'):
+                key = fname[:-len('.csv.gz')]
+                partitions[key] = _partition_entry(_read_csv(os.path.join(parts, fname)),
+                                                   _ledger_stamp(os.path.join(parts, fname)))
+    partitions[OPEN_PARTITION] = _partition_entry(_read_csv(csvp), _ledger_stamp(csvp))
+    open_from = partitions[OPEN_PARTITION]['min_date']
+    return {'open_from': int(open_from[:4]) if open_from else date.today().year, 'partitions': partitions}
+
+def _ledger_manifest(csvp: str) -> dict:
+    """Load the manifest, refreshing entries whose files changed on disk and
+    closing past years. Creates/migrates the ledger on first use. Anything
+    that has to be written is done under the ledger lock."""
+    manifest = _check_manifest(csvp, write=False)
+    if manifest is None:
+        with _ledger_lock(csvp):
+            manifest = _check_manifest(csvp, write=True)
+    return manifest
+
+def _check_manifest(csvp: str, write: bool) -> Optional[dict]:
+    """The up-to-date manifest. Without write, None as soon as bringing it up
+    to date would need a write (the caller then retries under the lock)."""
+    if not os.path.exists(csvp) and not os.path.isdir(_parts_dir(csvp)):
+        # No ledger yet: it reads as empty, and nothing is created on disk
+        # until the first write.
+        return {'open_from': date.today().year,
+                'partitions': {OPEN_PARTITION: _partition_entry(_empty_df(), None)}}
+    if not os.path.exists(csvp) or _is_legacy(csvp):
+        if not write:
+            return None
+        if not os.path.exists(csvp):
+            _create_ledger(csvp)
+        if _is_legacy(csvp):
+            _migrate_legacy(csvp)
+    try:
+        with open(_manifest_path(csvp), 'r') as f:
+            manifest = json.load(f)
+        dirty = False
+    except Exception:
+        if not write:
+            return None
+        manifest, dirty = _scan_manifest(csvp), True
+    for key in list(manifest['partitions']):
+        src = _partition_file(csvp, key)
+        stamp = _ledger_stamp(src)
+        if stamp is None and key != OPEN_PARTITION:
+            del manifest['partitions'][key]
+            dirty = True
+        elif list(stamp or []) != (manifest['partitions'][key]['stamp'] or []):
+            manifest['partitions'][key] = _partition_entry(_read_csv(src), stamp)
+            dirty = True
+    if manifest['open_from'] < date.today().year:
+        if not write:
+            return None
+        _close_years(csvp, manifest, date.today().year)
+        dirty = True
+    if dirty:
+        if not write:
+            return None
+        _save_manifest(csvp, manifest)
+    return manifest
+
+def _close_years(csvp: str, manifest: dict, open_from: int):
+    """Move rows dated before open_from out of the open partition into
+    compressed per-year partitions."""
+    df = _read_csv(csvp)
+    if not df.empty:
+        years = pd.to_datetime(df['date']).dt.year
+        for year, rows in df[years < open_from].groupby(years[years < open_from]):
+            key = str(year)
+            old = _read_csv(_partition_file(csvp, key)) if key in manifest['partitions'] else _empty_df()
+            _write_partition(csvp, manifest, key, pd.concat([old, rows], ignore_index=True))
+        _write_partition(csvp, manifest, OPEN_PARTITION, df[years >= open_from].reset_index(drop=True))
+    manifest['open_from'] = open_from
+
+def _read_partition(csvp: str, key: str) -> pd.DataFrame:
+    return _decode_frame(_partition_frame(csvp, key))
+
+def _write_partition(csvp: str, manifest: dict, key: str, df: pd.DataFrame):
+    """Rewrite one partition (CSV, columnar mirror, manifest entry)."""
+    path = _partition_file(csvp, key)
+    df = df[COLUMNS].reset_index(drop=True)
+    df['amount'] = df['amount'].astype('int64')
+    if df.empty and key != OPEN_PARTITION:
+        for p in (path, _partition_cols(csvp, key)):
+            if os.path.exists(p):
+                os.remove(p)
+        manifest['partitions'].pop(key, None)
+        return
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    _write_csv(path, df)
+    stamp = _ledger_stamp(path)
+    _write_columns(_partition_cols(csvp, key), df, stamp)
+    manifest['partitions'][key] = _partition_entry(df, stamp)
+
+def _ledger_version(csvp: str):
+    """Stamp that changes whenever any partition of the ledger changes."""
+    _ledger_manifest(csvp)
+    return _ledger_stamp(_manifest_path(csvp))
+
+def _commit(csvp: str, manifest: dict, before, added: Optional[List[dict]] = None,
+            removed: Optional[List[dict]] = None):
+    """Save the manifest after partition writes and update in-memory indexes.
+    Pass the rows added/removed so indexes can be patched; without them they
+    are rebuilt lazily."""
+    _save_manifest(csvp, manifest)
+    _ledger_changed(csvp, before, added, removed)
+
+@_locked_path
+def _insert_rows(csvp: str, rows: pd.DataFrame) -> List[int]:
+    """Append rows to the partitions of their dates; returns their ledger positions."""
+    _create_ledger(csvp)
+    manifest = _ledger_manifest(csvp)
+    before = _ledger_stamp(_manifest_path(csvp))
+    rows = rows[COLUMNS].reset_index(drop=True)
+    keys = _partition_key(rows['date'], manifest['open_from'])
+    placed = {}
+    for key, part in rows.groupby(keys, sort=False):
+        df = _read_partition(csvp, key) if key in manifest['partitions'] else _empty_df()
+        placed[key] = (len(df), part.index)
+        _write_partition(csvp, manifest, key, pd.concat([df, part], ignore_index=True) if not df.empty else part)
+    positions = [0] * len(rows)
+    offsets = _partition_offsets(manifest)
+    for key, (local, idx) in placed.items():
+        for i, r in enumerate(idx):
+            positions[r] = offsets[key] + local + i
+    _commit(csvp, manifest, before, added=rows.to_dict(orient='records'))
+    return positions
+
+def _locate(manifest: dict, index: int) -> Tuple[str, int]:
+    for key, offset in reversed(list(_partition_offsets(manifest).items())):
+        if index >= offset:
+            if index - offset >= manifest['partitions'][key]['rows']:
+                break
+            return key, index - offset
+    raise IndexError('index out of range')
+
+@_locked_path
+def _delete_rows(csvp: str, indices: List[int]) -> List[dict]:
+    """Remove rows by ledger position, rewriting only their partitions."""
+    manifest = _ledger_manifest(csvp)
+    before = _ledger_stamp(_manifest_path(csvp))
+    by_key: Dict[str, List[int]] = {}
+    for index in indices:
+        key, local = _locate(manifest, int(index))
+        by_key.setdefault(key, []).append(local)
+    removed = []
+    for key, locals_ in by_key.items():
+        df = _read_partition(csvp, key)
+        removed.extend(df.loc[locals_].to_dict(orient='records'))
+        _write_partition(csvp, manifest, key, df.drop(index=locals_))
+    _commit(csvp, manifest, before, removed=removed)
+    return removed
+
+@_locked_path
+def _replace_row(csvp: str, index: int, row: dict) -> Tuple[dict, int]:
+    """Replace the row at a ledger position. A row whose date moves it to a
+    different partition is re-appended there. Returns (old row, new position)."""
+    manifest = _ledger_manifest(csvp)
+    key, local = _locate(manifest, int(index))
+    new_key = _partition_key(pd.Series([row['date']]), manifest['open_from']).iloc[0]
+    if new_key != key:
+        old = _delete_rows(csvp, [index])[0]
+        return old, _insert_rows(csvp, pd.DataFrame([row], columns=COLUMNS))[0]
+    before = _ledger_stamp(_manifest_path(csvp))
+    df = _read_partition(csvp, key)
+    old = df.loc[local].to_dict()
+    for k in COLUMNS:
+        df.at[local, k] = row[k]
+    _write_partition(csvp, manifest, key, df)
+    _commit(csvp, manifest, before, added=[row], removed=[old])
+    return old, index
+
+@_locked_path
+def _rewrite_all(csvp: str, transform):
+    """Apply transform(df) -> df to every partition (e.g. rescaling amounts)."""
+    _create_ledger(csvp)
+    manifest = _ledger_manifest(csvp)
+    before = _ledger_stamp(_manifest_path(csvp))
+    for key in _partition_keys(manifest):
+        _write_partition(csvp, manifest, key, transform(_read_partition(csvp, key)))
+    _commit(csvp, manifest, before)
+
+def _ledger_stamp(path: str):
+    # Files are replaced, not rewritten in place, so the inode tells two
+    # versions apart even when the clock has not ticked between them.
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+    except OSError:
+        return None
+
+# Running balance index: per ledger, the distinct transaction days in order
+# plus prefix sums of income and expense up to and including each day. Kept
+# in memory, patched on our own writes and rebuilt when the file was changed
+# by someone else (detected through its mtime/size stamp).
+_BALANCE_INDEX: Dict[str, dict] = {}
+
+def _to_day(d) -> np.datetime64:
+    return np.datetime64(pd.Timestamp(d).date(), 'D')
+
+def _period_start(day: pd.Timestamp, period: str) -> str:
+    """Start of the budget period containing day (weeks start on Monday)."""
+    if period == 'weekly':
+        day = day - pd.Timedelta(days=day.weekday())
+    else:
+        day = day.replace(day=1)
+    return day.strftime('%Y-%m-%d')
+
+def _period_start_days(days: np.ndarray, period: str) -> np.ndarray:
+    """Vectorised _period_start over int days since 1970-01-01 (a Thursday)."""
+    days = days.astype('int64')
+    if period == 'weekly':
+        return days - (days + 3) % 7
+    return days.astype('datetime64[D]').astype('datetime64[M]').astype('datetime64[D]').astype('int64')
+
+def _type_mask(frame: pd.DataFrame, t_type: str) -> np.ndarray:
+    types = frame.attrs['types']
+    if t_type not in types:
+        return np.zeros(len(frame), dtype=bool)
+    return frame['type'].to_numpy() == types.index(t_type)
+
+def _build_balance_index(frames: List[pd.DataFrame]) -> dict:
+    # Per-day sums of each partition, merged and only then accumulated.
+    days, income, expense = [], [], []
+    for frame in frames:
+        if not len(frame):
+            continue
+        d, pos = np.unique(frame['day'].to_numpy(), return_inverse=True)
+        amount = frame['amount'].to_numpy()
+        is_income = _type_mask(frame, 'income')
+        days.append(d)
+        for sums, mask in ((income, is_income), (expense, ~is_income)):
+            total = np.zeros(len(d), dtype='int64')
+            np.add.at(total, pos[mask], amount[mask])
+            sums.append(total)
+    if not days:
+        days = np.array([], dtype='datetime64[D]')
+        return {'days': days, 'income': np.zeros(0, dtype='int64'), 'expense': np.zeros(0, dtype='int64')}
+    merged, pos = np.unique(np.concatenate(days), return_inverse=True)
+    sums = {}
+    for name, parts in (('income', income), ('expense', expense)):
+        total = np.zeros(len(merged), dtype='int64')
+        np.add.at(total, pos, np.concatenate(parts))
+        sums[name] = np.cumsum(total)
+    return {'days': merged.astype('datetime64[D]'), 'income': sums['income'], 'expense': sums['expense']}
+
+def _patch_balance_index(index: dict, row: dict, sign: int):
+    day = _to_day(row['date'])
+    col = 'income' if row['type'] == 'income' else 'expense'
+    p = int(np.searchsorted(index['days'], day))
+    if p == len(index['days']) or index['days'][p] != day:
+        # New day: carry forward the running totals of the previous day.
+        index['days'] = np.insert(index['days'], p, day)
+        for c in ('income', 'expense'):
+            prev = index[c][p - 1] if p > 0 else 0
+            index[c] = np.insert(index[c], p, prev)
+    index[col][p:] += sign * int(row['amount'])
+    if sign < 0:
+        # Amounts are positive, so a day whose own sums are back to zero has
+        # no rows left; drop it as a rebuild would.
+        own = [index[c][p] - (index[c][p - 1] if p > 0 else 0) for c in ('income', 'expense')]
+        if not any(own):
+            for c in ('days', 'income', 'expense'):
+                index[c] = np.delete(index[c], p)
+
+def _build_spend_rollup(frames: List[pd.DataFrame]) -> dict:
+    # A week can straddle two year partitions, so partition sums are added.
+    spend: Dict[tuple, int] = {}
+    for frame in frames:
+        is_expense = _type_mask(frame, 'expense')
+        if not is_expense.any():
+            continue
+        categories = frame.attrs['categories']
+        codes = frame['category'].to_numpy()[is_expense]
+        amounts = frame['amount'].to_numpy()[is_expense]
+        days = frame['day'].to_numpy()[is_expense]
+        for period in BUDGET_PERIODS:
+            starts = _period_start_days(days, period)
+            sums = pd.Series(amounts).groupby([codes, starts]).sum()
+            for (code, start), amount in sums.items():
+                key = (categories[code], period, str(np.datetime64(int(start), 'D')))
+                spend[key] = spend.get(key, 0) + int(amount)
+    return {'spend': spend}
+
+def _patch_spend_rollup(rollup: dict, row: dict, sign: int):
+    # Only the (category, period) buckets the row falls in are touched.
+    if row['type'] != 'expense':
+        return
+    day = pd.Timestamp(row['date'])
+    for period in BUDGET_PERIODS:
+        key = (row['category'], period, _period_start(day, period))
+        amount = rollup['spend'].get(key, 0) + sign * int(row['amount'])
+        if amount:
+            rollup['spend'][key] = amount
+        else:
+            rollup['spend'].pop(key, None)
+
+# Fingerprint index: how many ledger rows share each fingerprint. Built from
+# the fingerprint column the columnar mirrors store, so a fresh process does
+# not re-hash the ledger, and patched on every write like the other indexes.
+def _build_fingerprint_index(frames: List[pd.DataFrame]) -> dict:
+    counts: Dict[int, int] = {}
+    for frame in frames:
+        fps, n = np.unique(frame['fingerprint'].to_numpy(), return_counts=True)
+        for fp, c in zip(fps.tolist(), n.tolist()):
+            counts[fp] = counts.get(fp, 0) + c
+    return {'counts': counts}
+
+def _patch_fingerprint_index(index: dict, row: dict, sign: int):
+    fp = _fingerprint(row['date'], row['amount'], row['category'], row['type'])
+    count = index['counts'].get(fp, 0) + sign
+    if count > 0:
+        index['counts'][fp] = count
+    else:
+        index['counts'].pop(fp, None)
+
+# Per-ledger indexes: name -> (cache, build from the partition frames, patch
+# with one row). Builders reduce each partition on its own view and merge the
+# results, so no concatenated copy of the ledger is made.
+_INDEXES = {
+    'balance': (_BALANCE_INDEX, _build_balance_index, _patch_balance_index),
+    'spend': ({}, _build_spend_rollup, _patch_spend_rollup),
+    'fingerprints': ({}, _build_fingerprint_index, _patch_fingerprint_index),
+}
+
+def _ledger_changed(path: str, before, added: Optional[List[dict]], removed: Optional[List[dict]]):
+    for cache, _, patch in _INDEXES.values():
+        entry = cache.get(path)
+        if entry is None:
+            continue
+        if entry['stamp'] != before or (added is None and removed is None):
+            del cache[path]
+            continue
+        for row in removed or []:
+            patch(entry, row, -1)
+        for row in added or []:
+            patch(entry, row, +1)
+        entry['stamp'] = _ledger_stamp(_manifest_path(path))
+
+def _ledger_index(name: str) -> dict:
+    """Return the named index for the current ledger, (re)building it if the
+    file changed behind our back."""
+    cache, build, _ = _INDEXES[name]
+    csvp, _ = _user_paths()
+    stamp = _ledger_version(csvp)
+    entry = cache.get(csvp)
+    if entry is None or entry['stamp'] != stamp:
+        entry = build(ledger_frames())
+        entry['stamp'] = stamp
+        cache[csvp] = entry
+    return entry
+
+def _balance_index() -> dict:
+    return _ledger_index('balance')
+
+def _totals_through(index: dict, days) -> tuple:
+    """Cumulative (income, expense) arrays at the end of each of `days`."""
+    days = np.atleast_1d(np.asarray(days, dtype='datetime64[D]'))
+    if not len(index['days']):
+        return np.zeros(len(days), dtype='int64'), np.zeros(len(days), dtype='int64')
+    pos = np.searchsorted(index['days'], days, side='right') - 1
+    safe = np.maximum(pos, 0)
+    income = np.where(pos >= 0, index['income'][safe], 0)
+    expense = np.where(pos >= 0, index['expense'][safe], 0)
+    return income, expense
+
+# Undo stack helpers. Each ledger has its own stack (undo.json for the
+# default ledger, undo_<user>.json otherwise), so one user's undo never
+# reverts another user's change.
+def _undo_path() -> str:
+    user = current_user()
+    if user:
+        return os.path.join(BASE_DIR, f'undo_{user}.json')
+    return UNDO_PATH
 
-# Undo stack helpers
 def _load_undo() -> List[dict]:
     try:
-        if os.path.exists(UNDO_PATH):
-            with open(UNDO_PATH, 'r') as f:
+        if os.path.exists(_undo_path()):
+            with open(_undo_path(), 'r') as f:
                 return json.load(f)
     except Exception:
         pass
@@ -57,7 +995,7 @@ def _load_undo() -> List[dict]:
 
 def _save_undo(stack: List[dict]):
     try:
-        with open(UNDO_PATH, 'w') as f:
+        with open(_undo_path(), 'w') as f:
             json.dump(stack[-50:], f)
     except Exception:
         pass
@@ -67,33 +1005,58 @@ def _push_undo(action: dict):
     stack.append(action)
     _save_undo(stack)
 
+def _undo_row(row: dict) -> dict:
+    return {'date': str(row['date']), 'amount': int(row['amount']),
+            'category': str(row['category']), 'type': str(row['type'])}
+
+def _find_rows(rows: List[dict]) -> List[int]:
+    """Ledger positions of rows identified by content (their fingerprint).
+
+    Undo entries store rows, not positions: back-dated inserts, moves between
+    partitions and closing a year all shift positions. Identical rows match
+    the most recent copies first. Raises LookupError if a row is gone.
+    """
+    wanted: Dict[int, int] = {}
+    for fp in _fingerprints(pd.DataFrame(rows, columns=COLUMNS)).tolist():
+        wanted[fp] = wanted.get(fp, 0) + 1
+    dates = [r['date'] for r in rows]
+    frames = ledger_frames(min(dates), max(dates))
+    fps = np.concatenate([f['fingerprint'].to_numpy() for f in frames])
+    positions = np.concatenate([f.index.to_numpy() for f in frames])
+    found = []
+    for i in np.flatnonzero(np.isin(fps, np.fromiter(wanted, dtype='uint64', count=len(wanted))))[::-1]:
+        fp = int(fps[i])
+        if wanted[fp]:
+            wanted[fp] -= 1
+            found.append(int(positions[i]))
+    if any(wanted.values()):
+        raise LookupError('the rows to undo are no longer in the ledger')
+    return sorted(found)
+
+@_locked
 def undo_last() -> bool:
+    """Revert the most recent add, edit or delete; False if there is nothing
+    to undo or the entry no longer applies (its rows were changed or removed
+    since). Either way the entry is popped, so it cannot block older ones."""
+    csvp, _ = _user_paths()
     stack = _load_undo()
     if not stack:
         return False
     last = stack.pop()
+    _save_undo(stack)
     try:
         if last['action'] == 'add':
-            df = _read_df()
-            idx = last.get('index')
-            if idx is not None and idx < len(df):
-                df = df.drop(index=idx).reset_index(drop=True)
-                _write_df(df)
+            # Entries from older versions recorded positions only ('indices');
+            # those cannot be matched safely and are dropped.
+            rows = last['rows']
+            if rows:
+                _delete_rows(csvp, _find_rows(rows))
         elif last['action'] == 'delete':
-            df = _read_df()
             rows = last.get('rows', [])
             if rows:
-                df = pd.concat([df, pd.DataFrame(rows, columns=COLUMNS)], ignore_index=True)
-                _write_df(df)
+                _insert_rows(csvp, pd.DataFrame(rows, columns=COLUMNS))
         elif last['action'] == 'edit':
-            df = _read_df()
-            idx = last.get('index')
-            old = last.get('old')
-            if idx is not None and old is not None:
-                for k, v in old.items():
-                    df.at[idx, k] = v
-                _write_df(df)
-        _save_undo(stack)
+            _replace_row(csvp, _find_rows([last['new']])[0], last['old'])
         return True
     except Exception:
         return False
@@ -137,63 +1100,179 @@ def _validate_date(d: str) -> bool:
     except Exception:
         return False
 
+def _normalize_date(d) -> str:
+    return datetime.strptime(str(d), '%Y-%m-%d').strftime('%Y-%m-%d')
+
+@_locked
 def add_transaction(date: str, amount, category: str, t_type: str):
     if not _validate_date(str(date)):
         raise ValueError('date must be YYYY-MM-DD')
-    try:
-        amount = float(amount)
-        if amount <= 0:
-            raise ValueError('amount must be positive')
-    except Exception:
-        raise ValueError('amount must be a number > 0')
+    amount = _to_minor(amount, get_currency()[1])
     if category not in get_categories():
         raise ValueError('invalid category')
     if t_type not in ['income', 'expense']:
         raise ValueError("type must be 'income' or 'expense'")
-    df = _read_df()
-    new = pd.DataFrame([{'date': date, 'amount': amount, 'category': category, 'type': t_type}], columns=COLUMNS)
-    if df.empty:
-        df = new
-    else:
-        df = pd.concat([df, new], ignore_index=True)
-    _write_df(df)
-    _push_undo({'action': 'add', 'index': len(df)-1})
+    row = {'date': _normalize_date(date), 'amount': amount, 'category': category, 'type': t_type}
+    _insert_rows(_user_paths()[0], pd.DataFrame([row], columns=COLUMNS))
+    _push_undo({'action': 'add', 'rows': [row]})
 
+@_locked
 def edit_transaction(index: int, date: Optional[str] = None, amount: Optional[float] = None,
                      category: Optional[str] = None, t_type: Optional[str] = None):
-    df = _read_df()
-    if index < 0 or index >= len(df):
+    if index < 0:
         raise IndexError('index out of range')
-    old = df.loc[index].to_dict()
+    csvp, _ = _user_paths()
+    key, local = _locate(_ledger_manifest(csvp), index)
+    row = _decode_frame(_partition_frame(csvp, key).iloc[local:local + 1]).iloc[0].to_dict()
     if date is not None:
         if not _validate_date(str(date)):
             raise ValueError('date must be YYYY-MM-DD')
-        df.at[index, 'date'] = date
+        row['date'] = _normalize_date(date)
     if amount is not None:
-        try:
-            amount = float(amount)
-            if amount <= 0:
-                raise ValueError('amount must be positive')
-        except Exception:
-            raise ValueError('amount must be a number > 0')
-        df.at[index, 'amount'] = amount
+        row['amount'] = _to_minor(amount, get_currency()[1])
     if category is not None:
         if category not in get_categories():
             raise ValueError('invalid category')
-        df.at[index, 'category'] = category
+        row['category'] = category
     if t_type is not None:
         if t_type not in ['income', 'expense']:
             raise ValueError("type must be 'income' or 'expense'")
-        df.at[index, 'type'] = t_type
-    _write_df(df)
-    _push_undo({'action': 'edit', 'index': index, 'old': old})
+        row['type'] = t_type
+    old, _ = _replace_row(csvp, index, row)
+    _push_undo({'action': 'edit', 'old': _undo_row(old), 'new': _undo_row(row)})
+
+def _prepare_rows(rows) -> Tuple[pd.DataFrame, pd.DataFrame, pd.Series]:
+    """Vectorised validation for bulk paths. Returns (rows as given with a
+    fresh index, the rows normalised to ledger form plus 'ref', reason per
+    row, '' when valid)."""
+    rows = pd.DataFrame(rows)
+    for c in COLUMNS:
+        if c not in rows.columns:
+            rows[c] = None
+    rows = rows.reset_index(drop=True)
+    dates = pd.to_datetime(rows['date'].astype(str), format='%Y-%m-%d', errors='coerce')
+    minor, amount_ok = _parse_amounts(rows['amount'], get_currency()[1])
+    reason = pd.Series('', index=rows.index, dtype=object)
+    reason[~rows['type'].isin(TYPES)] = "type must be 'income' or 'expense'"
+    reason[~rows['category'].isin(get_categories())] = 'invalid category'
+    reason[~amount_ok] = 'amount must be a number > 0'
+    reason[dates.isna()] = 'date must be YYYY-MM-DD'
+    refs = rows['ref'] if 'ref' in rows.columns else pd.Series(None, index=rows.index, dtype=object)
+    normalised = pd.DataFrame({'date': dates.dt.strftime('%Y-%m-%d'), 'amount': minor,
+                               'category': rows['category'], 'type': rows['type'],
+                               'ref': refs.where(refs.notna() & (refs.astype(str).str.strip() != ''))})
+    return rows, normalised, reason
 
+@_locked
+def add_transactions(rows, skip_duplicates: bool = False, record_undo: bool = True) -> Tuple[int, pd.DataFrame]:
+    """Append many transactions with a single ledger write.
+
+    rows is a DataFrame (or list of dicts) with the COLUMNS fields and an
+    optional 'ref' (e.g. a bank transaction id); amounts are in major units as
+    with add_transaction. Validation is vectorised; invalid rows are not
+    written and are returned with a 'reason' column. With skip_duplicates,
+    rows already in the ledger (see find_duplicates) are returned too, with
+    reason 'duplicate'. Returns (number added, rejected rows). Unattended
+    writers (the HTTP API) pass record_undo=False so their batches never land
+    on the interactive undo stack.
+    """
+    rows, normalised, reason = _prepare_rows(rows)
+    if skip_duplicates:
+        valid = (reason == '').to_numpy()
+        duplicate = np.zeros(len(rows), dtype=bool)
+        duplicate[valid] = _duplicate_mask(normalised[valid])
+        reason[duplicate] = 'duplicate'
+    ok = (reason == '').to_numpy()
+    new = normalised[ok].reset_index(drop=True)
+    rejected = rows.loc[~ok].assign(reason=reason[~ok])
+    if new.empty:
+        return 0, rejected
+    _insert_rows(_user_paths()[0], new)
+    _record_refs(new)
+    if record_undo:
+        _push_undo({'action': 'add', 'rows': [_undo_row(r) for r in new.to_dict(orient='records')]})
+    return len(new), rejected
+
+@_locked
 def delete_transaction(indices: List[int]):
-    df = _read_df()
-    rows = df.loc[indices].to_dict(orient='records') if len(indices) else []
-    df = df.drop(index=indices).reset_index(drop=True)
-    _write_df(df)
-    _push_undo({'action': 'delete', 'rows': rows})
+    rows = _delete_rows(_user_paths()[0], indices) if len(indices) else []
+    _push_undo({'action': 'delete', 'rows': [_undo_row(r) for r in rows]})
+
+# Duplicate detection: an overlapping statement imported twice, or recurring
+# rules applied again, must not add the same rows twice. Rows are matched on
+# their fingerprint through the in-memory fingerprint index; import refs are
+# kept in <ledger>.parts/import_refs.json as ref -> fingerprint.
+def _refs_path(csvp: str) -> str:
+    return os.path.join(_parts_dir(csvp), 'import_refs.json')
+
+def _load_refs(csvp: str) -> Dict[str, int]:
+    try:
+        with open(_refs_path(csvp), 'r') as f:
+            refs = json.load(f)
+        if isinstance(refs, dict):
+            return refs
+    except Exception:
+        pass
+    return {}
+
+def _record_refs(rows: pd.DataFrame):
+    """Remember the import refs of rows just written."""
+    if 'ref' not in rows.columns or not rows['ref'].notna().any():
+        return
+    csvp, _ = _user_paths()
+    refs = _load_refs(csvp)
+    rows = rows[rows['ref'].notna()]
+    refs.update(zip(rows['ref'].astype(str), _fingerprints(rows).tolist()))
+    path = _refs_path(csvp)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(refs, f)
+    os.replace(tmp, path)
+
+def _duplicate_mask(rows: pd.DataFrame) -> np.ndarray:
+    """Anti-join of normalised rows against the ledger, one O(1) lookup per row.
+
+    A row with a ref is a duplicate when that ref was imported before and its
+    row is still in the ledger, or when the ref repeats earlier in the batch.
+    Other rows are matched by count: the k-th identical row of the batch is a
+    duplicate while the ledger holds at least k identical rows, so a statement
+    with two genuine identical purchases still imports both once.
+    """
+    if rows.empty:
+        return np.zeros(0, dtype=bool)
+    counts = _ledger_index('fingerprints')['counts']
+    fps = pd.Series(_fingerprints(rows).tolist(), index=rows.index, dtype=object)
+    has_ref = rows['ref'].notna() if 'ref' in rows.columns else pd.Series(False, index=rows.index)
+    plain = fps[~has_ref]
+    seen_before = plain.groupby(plain).cumcount()
+    duplicate = pd.Series(False, index=rows.index)
+    duplicate[~has_ref] = seen_before < plain.map(lambda fp: counts.get(fp, 0))
+    if has_ref.any():
+        csvp, _ = _user_paths()
+        known = _load_refs(csvp)
+        refs = rows.loc[has_ref, 'ref'].astype(str)
+        imported = refs.map(lambda r: counts.get(known.get(r), 0) > 0)
+        duplicate[has_ref] = imported | refs.duplicated()
+    return duplicate.to_numpy()
+
+def find_duplicates(rows) -> pd.DataFrame:
+    """The rows (same input as add_transactions) that are already in the
+    ledger. Invalid rows are never reported as duplicates."""
+    rows, normalised, reason = _prepare_rows(rows)
+    valid = (reason == '').to_numpy()
+    duplicate = np.zeros(len(rows), dtype=bool)
+    duplicate[valid] = _duplicate_mask(normalised[valid])
+    return rows[duplicate]
+
+def is_duplicate(date: str, amount, category: str, t_type: str, ref: Optional[str] = None) -> bool:
+    """O(1) check whether a transaction (or an import ref) is already in the ledger."""
+    counts = _ledger_index('fingerprints')['counts']
+    if ref:
+        csvp, _ = _user_paths()
+        return counts.get(_load_refs(csvp).get(str(ref)), 0) > 0
+    fp = _fingerprint(_normalize_date(date), _to_minor(amount, get_currency()[1]), category, t_type)
+    return counts.get(fp, 0) > 0
 
 # Exports
 def export_to_csv(df: pd.DataFrame, filename: str):
@@ -222,54 +1301,107 @@ def export_to_pdf(df: pd.DataFrame, filename: str):
     pdf.output(filename)
 
 # Summaries
-def get_transactions() -> pd.DataFrame:
-    return _read_df()
+def get_transactions(start=None, end=None) -> pd.DataFrame:
+    """The ledger for display and charting, amounts in major units (12.34).
+    start/end (inclusive) limit the rows and the partitions read."""
+    df = read_ledger(start, end)
+    df['amount'] = df['amount'] / 10 ** get_currency()[1]
+    return df
 
 def get_summary():
-    df = _read_df()
-    total_income = df[df['type'] == 'income']['amount'].sum() if not df.empty else 0
-    total_expense = df[df['type'] == 'expense']['amount'].sum() if not df.empty else 0
-    return total_income, total_expense, total_income - total_expense
+    """(income, expense, savings) over the whole ledger as exact Decimals,
+    from the per-partition totals in the manifest."""
+    csvp, _ = _user_paths()
+    partitions = _ledger_manifest(csvp)['partitions'].values()
+    precision = get_currency()[1]
+    total_income = sum(p['income'] for p in partitions)
+    total_expense = sum(p['expense'] for p in partitions)
+    return (to_decimal(total_income, precision), to_decimal(total_expense, precision),
+            to_decimal(total_income - total_expense, precision))
+
+def get_period_summary(start=None, end=None):
+    """Like get_summary, restricted to start..end inclusive (either may be None).
+
+    Answered from the running balance index in O(log N) instead of a rescan.
+    """
+    index = _balance_index()
+    if end is None:
+        inc_end = index['income'][-1] if len(index['days']) else 0
+        exp_end = index['expense'][-1] if len(index['days']) else 0
+    else:
+        inc, exp = _totals_through(index, [_to_day(end)])
+        inc_end, exp_end = inc[0], exp[0]
+    inc_start, exp_start = 0, 0
+    if start is not None:
+        inc, exp = _totals_through(index, [_to_day(start) - np.timedelta64(1, 'D')])
+        inc_start, exp_start = inc[0], exp[0]
+    precision = get_currency()[1]
+    total_income = int(inc_end - inc_start)
+    total_expense = int(exp_end - exp_start)
+    return (to_decimal(total_income, precision), to_decimal(total_expense, precision),
+            to_decimal(total_income - total_expense, precision))
+
+def balance_at(d) -> Decimal:
+    """Balance (all income minus all expense) at the end of day d, in O(log N)."""
+    income, expense = _totals_through(_balance_index(), [_to_day(d)])
+    return to_decimal(income[0] - expense[0], get_currency()[1])
+
+def balance_series(start, end, freq: str = 'D') -> pd.Series:
+    """Balance at each period end from start to end; freq is a pandas alias
+    ('D', 'W', 'M', ...). Each point is one O(log N) lookup."""
+    freq = {'M': 'ME', 'Q': 'QE', 'Y': 'YE', 'A': 'YE'}.get(freq, freq)
+    points = pd.date_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize(), freq=freq)
+    income, expense = _totals_through(_balance_index(), points.values.astype('datetime64[D]'))
+    return pd.Series((income - expense) / 10 ** get_currency()[1], index=points, name='balance')
 
-def monthly_trends():
-    df = _read_df()
+def month_start(d=None) -> str:
+    """First day of the month containing d (default today) as YYYY-MM-DD."""
+    d = d or date.today()
+    return d.replace(day=1).strftime('%Y-%m-%d')
+
+def monthly_trends(start=None, end=None):
+    df = read_ledger(start, end)
     if df.empty:
         return pd.DataFrame()
     df['month'] = pd.to_datetime(df['date']).dt.to_period('M')
-    return df.groupby(['month', 'category'])['amount'].sum().unstack(fill_value=0)
+    trends = df.groupby(['month', 'category'])['amount'].sum().unstack(fill_value=0)
+    return trends / 10 ** get_currency()[1]
 
 # Recurring rules
-def add_recurring(rule: Dict):
-    rules = []
+def get_recurring() -> List[dict]:
     if os.path.exists(RECURRING_PATH):
         try:
             with open(RECURRING_PATH, 'r') as f:
-                rules = json.load(f)
+                return json.load(f)
         except Exception:
-            rules = []
+            pass
+    return []
+
+def add_recurring(rule: Dict):
+    rules = get_recurring()
     rules.append(rule)
     with open(RECURRING_PATH, 'w') as f:
         json.dump(rules, f)
 
-def apply_recurring(until_date: Optional[str] = None):
+@_locked
+def apply_recurring(until_date: Optional[str] = None) -> Tuple[int, pd.DataFrame]:
+    """Write every occurrence of the recurring rules up to until_date (default
+    today) that is not in the ledger yet. Returns (number added, the
+    occurrences skipped as duplicates, amounts in major units)."""
     if not os.path.exists(RECURRING_PATH):
-        return
+        return 0, _empty_df()
     with open(RECURRING_PATH, 'r') as f:
         rules = json.load(f)
-    df = _read_df()
+    precision = get_currency()[1]
+    candidates = []
     for r in rules:
+        amount = _to_minor(r['amount'], precision)
         start = datetime.strptime(r['start_date'], '%Y-%m-%d').date()
         end = date.today() if not until_date else datetime.strptime(until_date, '%Y-%m-%d').date()
         freq = r.get('freq', 'monthly')
         cur = start
         while cur <= end:
-            exists = ((df['date'] == cur.strftime('%Y-%m-%d')) & (df['amount'] == r['amount']) & (df['category'] == r['category']) & (df['type'] == r['type'])).any()
-            if not exists:
-                new_row = pd.DataFrame([{'date': cur.strftime('%Y-%m-%d'), 'amount': r['amount'], 'category': r['category'], 'type': r['type']}], columns=COLUMNS)
-                if df.empty:
-                    df = new_row
-                else:
-                    df = pd.concat([df, new_row], ignore_index=True)
+            candidates.append({'date': cur.strftime('%Y-%m-%d'), 'amount': amount, 'category': r['category'], 'type': r['type']})
             if freq == 'daily':
                 cur = cur + timedelta(days=1)
             elif freq == 'weekly':
@@ -280,4 +1412,200 @@ def apply_recurring(until_date: Optional[str] = None):
                 month = ((month - 1) % 12) + 1
                 day = min(cur.day, 28)
                 cur = date(year, month, day)
-    _write_df(df)
\ No newline at end of file
+    # Overlapping rules produce one occurrence per day, as before.
+    candidates = pd.DataFrame(candidates, columns=COLUMNS).drop_duplicates(ignore_index=True)
+    duplicate = _duplicate_mask(candidates)
+    added = candidates[~duplicate]
+    if not added.empty:
+        _insert_rows(_user_paths()[0], added)
+    skipped = candidates[duplicate].reset_index(drop=True)
+    skipped['amount'] = skipped['amount'] / 10 ** precision
+    return len(added), skipped
+
+# Cash-flow forecast. Rules are expanded straight into NumPy day arrays (one
+# concatenated arange per frequency) and summed per day with bincount, so a
+# multi-year forecast over many rules never builds a row per occurrence.
+def _ranges(first: np.ndarray, counts: np.ndarray, step) -> Tuple[np.ndarray, np.ndarray]:
+    """For each i, first[i] + step * k for k < counts[i], concatenated.
+    Returns (owner i of each value, values)."""
+    counts = np.maximum(counts, 0)
+    owner = np.repeat(np.arange(len(counts)), counts)
+    k = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owner, first[owner] + k * step
+
+def _expand_rules(rules: List[dict], first: np.datetime64, last: np.datetime64) -> pd.DataFrame:
+    """Occurrences of the rules between first and last (inclusive), on the same
+    schedule as apply_recurring, as columns day (int days since 1970-01-01, as
+    in ledger_frames), amount (minor units), category and type. Invalid rules are ignored."""
+    precision = get_currency()[1]
+    parsed = []
+    for r in rules:
+        try:
+            parsed.append((np.datetime64(_normalize_date(r['start_date']), 'D'), _to_minor(r['amount'], precision),
+                           r['category'], r['type'], r.get('freq', 'monthly')))
+        except Exception:
+            continue
+    parts = []
+    for freq in ('daily', 'weekly', 'monthly'):
+        group = [p for p in parsed if (p[4] if p[4] in ('daily', 'weekly') else 'monthly') == freq]
+        if not group:
+            continue
+        starts = np.array([p[0] for p in group], dtype='datetime64[D]')
+        if freq == 'monthly':
+            # Month m >= 1 after the start falls on min(day, 28); m = 0 is the start itself.
+            start_month = starts.astype('datetime64[M]')
+            dom = np.minimum((starts - start_month.astype('datetime64[D]')).astype('int64'), 27)
+            m0 = np.maximum((first.astype('datetime64[M]') - start_month).astype('int64'), 0)
+            count = (last.astype('datetime64[M]') - start_month).astype('int64') - m0 + 1
+            owner, m = _ranges(m0, count, 1)
+            days = (start_month[owner] + m).astype('datetime64[D]') + dom[owner]
+            days = np.where(m == 0, starts[owner], days)
+        else:
+            step = 1 if freq == 'daily' else 7
+            skip = np.maximum(-(-(first - starts).astype('int64') // step), 0)
+            first_day = starts + skip * step
+            count = np.where(first_day <= last, (last - first_day).astype('int64') // step + 1, 0)
+            owner, days = _ranges(first_day, count, np.timedelta64(step, 'D'))
+        keep = (days >= first) & (days <= last)
+        owner, days = owner[keep], days[keep]
+        parts.append(pd.DataFrame({'day': days.astype('int64'), 'amount': np.array([p[1] for p in group], dtype='int64')[owner],
+                                   'category': np.array([p[2] for p in group], dtype=object)[owner],
+                                   'type': np.array([p[3] for p in group], dtype=object)[owner]}))
+    if not parts:
+        return pd.DataFrame({'day': np.zeros(0, dtype='int64'), 'amount': np.zeros(0, dtype='int64'),
+                             'category': np.zeros(0, dtype=object), 'type': np.zeros(0, dtype=object)})
+    return pd.concat(parts, ignore_index=True)
+
+def _baseline(first: np.datetime64, history_months: int) -> Tuple[float, float]:
+    """Average monthly (income, expense) in minor units over the last
+    history_months full months before first, leaving out rows that match an
+    occurrence of a recurring rule (those are forecast from the rules)."""
+    hist_end = first.astype('datetime64[M]').astype('datetime64[D]') - 1
+    hist_start = (first.astype('datetime64[M]') - history_months).astype('datetime64[D]')
+    days = _balance_index()['days']
+    if history_months <= 0 or not len(days) or days[0] > hist_end:
+        return 0.0, 0.0
+    # A ledger younger than the window is averaged over the months it covers.
+    covered = (hist_end.astype('datetime64[M]') - max(hist_start, days[0]).astype('datetime64[M]')).astype('int64') + 1
+    occurrences = _expand_rules(get_recurring(), hist_start, hist_end)
+    recurring = np.zeros(0, dtype='uint64')
+    if len(occurrences):
+        occurrences['date'] = np.datetime_as_string(occurrences['day'].to_numpy().astype('datetime64[D]'))
+        recurring = _fingerprints(occurrences)
+    income = expense = 0
+    for frame in ledger_frames(str(hist_start), str(hist_end)):
+        day = frame['day'].to_numpy()
+        in_window = (day >= hist_start.astype('int64')) & (day <= hist_end.astype('int64'))
+        in_window &= ~np.isin(frame['fingerprint'].to_numpy(), recurring)
+        amount = frame['amount'].to_numpy()
+        is_income = _type_mask(frame, 'income')
+        income += int(amount[in_window & is_income].sum())
+        expense += int(amount[in_window & ~is_income].sum())
+    return income / covered, expense / covered
+
+def forecast(months: int = 12, freq: str = 'D', start=None, history_months: int = 6) -> pd.DataFrame:
+    """Projected income, expense, net flow and balance for `months` months from
+    start (default tomorrow), without writing anything to the ledger.
+
+    Each day gets the occurrences of the recurring rules that fall on it plus
+    a baseline: the average monthly non-recurring income and expense of the
+    last history_months months, spread evenly over the days of each month.
+    The balance starts from the ledger balance on the day before start.
+    freq is 'D' (one row per day) or 'M' (month totals, balance at month end).
+    Amounts are floats in major units, as in balance_series.
+    """
+    first = _to_day(start) if start is not None else np.datetime64(date.today(), 'D') + 1
+    last = np.datetime64((pd.Timestamp(first) + pd.DateOffset(months=months)).date(), 'D') - 1
+    days = np.arange(first, last + 1, dtype='datetime64[D]')
+    occurrences = _expand_rules(get_recurring(), first, last)
+    pos = occurrences['day'].to_numpy() - first.astype('int64')
+    amount = occurrences['amount'].to_numpy().astype(float)
+    is_income = (occurrences['type'] == 'income').to_numpy()
+    income = np.bincount(pos[is_income], weights=amount[is_income], minlength=len(days)).astype(float)
+    expense = np.bincount(pos[~is_income], weights=amount[~is_income], minlength=len(days)).astype(float)
+    month = days.astype('datetime64[M]')
+    days_in_month = ((month + 1).astype('datetime64[D]') - month.astype('datetime64[D]')).astype('int64')
+    base_income, base_expense = _baseline(first, history_months)
+    income += base_income / days_in_month
+    expense += base_expense / days_in_month
+    opening = _totals_through(_balance_index(), first - 1)
+    scale = 10 ** get_currency()[1]
+    net = income - expense
+    result = pd.DataFrame({'income': income / scale, 'expense': expense / scale, 'net': net / scale,
+                           'balance': (int(opening[0][0] - opening[1][0]) + np.cumsum(net)) / scale},
+                          index=pd.DatetimeIndex(days, name='date'))
+    if freq == 'M':
+        monthly = result.groupby(result.index.to_period('M'))
+        result = monthly[['income', 'expense', 'net']].sum().assign(balance=monthly['balance'].last())
+        result.index = result.index.to_timestamp(how='end').normalize()
+        result.index.name = 'date'
+    return result
+
+# Budgets: per-category spending limits for a monthly or weekly period,
+# evaluated against the incrementally maintained spend rollup.
+def get_budgets() -> List[dict]:
+    if os.path.exists(BUDGETS_PATH):
+        try:
+            with open(BUDGETS_PATH, 'r') as f:
+                budgets = json.load(f)
+            if isinstance(budgets, list):
+                return budgets
+        except Exception:
+            pass
+    return []
+
+def _save_budgets(budgets: List[dict]):
+    with open(BUDGETS_PATH, 'w') as f:
+        json.dump(budgets, f)
+
+def set_budget(category: str, limit, period: str = 'monthly'):
+    if category not in get_categories():
+        raise ValueError('invalid category')
+    if period not in BUDGET_PERIODS:
+        raise ValueError("period must be 'monthly' or 'weekly'")
+    # Checked and stored at the ledger's precision, as an exact decimal string,
+    # so a limit that rounds to nothing can never be saved.
+    precision = get_currency()[1]
+    try:
+        limit = str(to_decimal(_to_minor(limit, precision), precision))
+    except ValueError:
+        raise ValueError('limit must be a number > 0')
+    budgets = [b for b in get_budgets() if not (b['category'] == category and b['period'] == period)]
+    budgets.append({'category': category, 'period': period, 'limit': limit})
+    _save_budgets(budgets)
+
+def remove_budget(category: str, period: str = 'monthly') -> bool:
+    budgets = get_budgets()
+    kept = [b for b in budgets if not (b['category'] == category and b['period'] == period)]
+    if len(kept) == len(budgets):
+        return False
+    _save_budgets(kept)
+    return True
+
+def budget_status(on=None) -> List[dict]:
+    """Spending against every budget for the period containing `on` (default
+    today). Each entry has category, period, period_start, limit, spent,
+    remaining, usage (spent / limit) and breached. Budgets whose entry is
+    malformed or whose limit rounds to zero at this ledger's precision (the
+    budgets file is shared by all ledgers) are left out."""
+    day = pd.Timestamp(on or date.today())
+    spend = _ledger_index('spend')['spend']
+    precision = get_currency()[1]
+    status = []
+    for b in get_budgets():
+        try:
+            if b['period'] not in BUDGET_PERIODS:
+                continue
+            limit = _to_minor(b['limit'], precision)
+        except (KeyError, TypeError, ValueError):
+            continue
+        start = _period_start(day, b['period'])
+        spent = spend.get((b['category'], b['period'], start), 0)
+        status.append({'category': b['category'], 'period': b['period'], 'period_start': start,
+                       'limit': to_decimal(limit, precision), 'spent': to_decimal(spent, precision),
+                       'remaining': to_decimal(limit - spent, precision),
+                       'usage': spent / limit, 'breached': spent > limit})
+    return status
+
+def breached_budgets(on=None) -> List[dict]:
+    return [b for b in budget_status(on) if b['breached']]
\ No newline at end of file
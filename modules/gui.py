@@ -5,8 +5,6 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from tkcalendar import DateEntry
 import pandas as pd
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.pyplot as plt
 from modules import data_handler
 
 class FinanceApp(tk.Tk):
@@ -21,7 +19,10 @@ class FinanceApp(tk.Tk):
         data_handler.init_db()
         self.refresh_summary()
         self.refresh_table()
-        self.refresh_dashboard()
+        self.check_budget_alert()
+        # Matplotlib is only loaded when the dashboard is first drawn; defer that
+        # until the window has been painted so startup is not blocked on it.
+        self.after_idle(self.refresh_dashboard)
 
     def add_hover(self, btn):
         def on_enter(e):
@@ -149,6 +150,9 @@ class FinanceApp(tk.Tk):
         budget_frame.pack(fill='x', padx=10, pady=10)
         ttk.Label(budget_frame, text='Set Budget Limit:').pack(side='left')
         ttk.Entry(budget_frame, textvariable=self.budget_limit).pack(side='left')
+        self.budget_period = tk.StringVar(value='All time')
+        ttk.Label(budget_frame, text='Compare against:').pack(side='left', padx=(10, 0))
+        ttk.Combobox(budget_frame, textvariable=self.budget_period, values=['All time', 'This month'], width=10).pack(side='left')
         self.budget_alert_label = ttk.Label(budget_frame, text='')
         self.budget_alert_label.pack(side='left', padx=10)
 
@@ -195,12 +199,12 @@ class FinanceApp(tk.Tk):
     def refresh_table(self):
         for row in self.tree.get_children():
             self.tree.delete(row)
-        df = data_handler.get_transactions()
-        # Apply filters
+        # Apply filters; the date range also limits which year partitions are read
         cat = self.filter_category.get()
         t_type = self.filter_type.get()
         date_from = self.filter_date_from.get()
         date_to = self.filter_date_to.get()
+        df = data_handler.get_transactions(date_from or None, date_to or None)
         if cat != 'All':
             df = df[df['category'] == cat]
         if t_type != 'All':
@@ -217,13 +221,22 @@ class FinanceApp(tk.Tk):
         self.summary_label.config(text=f'Total Income: {total_income:.2f} | Total Expense: {total_expense:.2f} | Savings: {savings:.2f}')
 
     def check_budget_alert(self):
-        _, total_expense, _ = data_handler.get_summary()
+        if self.budget_period.get() == 'This month':
+            _, total_expense, _ = data_handler.get_period_summary(start=data_handler.month_start())
+        else:
+            _, total_expense, _ = data_handler.get_summary()
+        breached = [f"{b['category']} ({b['period']})" for b in data_handler.breached_budgets()]
         if total_expense > self.budget_limit.get():
-            self.budget_alert_label.config(text='Budget Exceeded!', foreground='red')
+            text, color = 'Budget Exceeded!', 'red'
         else:
-            self.budget_alert_label.config(text='Within Budget', foreground='green')
+            text, color = 'Within Budget', 'green'
+        if breached:
+            text, color = f"{text} Over category budget: {', '.join(breached)}", 'red'
+        self.budget_alert_label.config(text=text, foreground=color)
 
     def refresh_dashboard(self):
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        import matplotlib.pyplot as plt
         df = data_handler.get_transactions()
         fig, axs = plt.subplots(1, 2, figsize=(9, 3))
         # Pie chart
@@ -0,0 +1,446 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import functools
+import threading
+import http.client
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from urllib.parse import urlparse
+from typing import Optional, List, Dict
+import numpy as np
+import pandas as pd
+
+# Load tests. api_load_test() drives the HTTP ingestion API (modules/api.py)
+# with concurrent clients posting batches of synthetic transactions and
+# reports sustained throughput, request latency and how well the server
+# coalesced the requests into group commits. streamlit_load_test() runs many
+# scripted Streamlit sessions at once against a scratch ledger, either as
+# separate processes or as threads sharing one data_handler (see below).
+
+LOADTEST_USER = 'loadtest'
+LOADTEST_CATEGORIES = ['Food', 'Rent', 'Utilities', 'Salary', 'Other']
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'streamlit_app.py')
+SESSION_ACTIONS = ['rerun', 'filter', 'add', 'delete', 'import']
+
+def synthetic_rows(n: int, seed: int = 0) -> List[dict]:
+    """n random but valid transactions dated within the last two years."""
+    rng = np.random.default_rng(seed)
+    days = np.datetime64('today', 'D') - rng.integers(0, 730, n)
+    amounts = rng.integers(100, 500000, n) / 100
+    categories = rng.choice(LOADTEST_CATEGORIES, n)
+    types = np.where(categories == 'Salary', 'income', 'expense')
+    return [{'date': str(d), 'amount': float(a), 'category': str(c), 'type': str(t)}
+            for d, a, c, t in zip(days, amounts, categories, types)]
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/max of latencies in seconds, reported in milliseconds."""
+    if not samples:
+        return {'p50': 0.0, 'p95': 0.0, 'p99': 0.0, 'max': 0.0}
+    arr = np.asarray(samples) * 1000
+    p50, p95, p99 = np.percentile(arr, [50, 95, 99])
+    return {'p50': float(p50), 'p95': float(p95), 'p99': float(p99), 'max': float(arr.max())}
+
+def _request(conn: http.client.HTTPConnection, method: str, path: str, payload=None):
+    body = json.dumps(payload).encode('utf-8') if payload is not None else None
+    conn.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+    response = conn.getresponse()
+    data = json.loads(response.read() or b'null')
+    if response.status != 200:
+        raise RuntimeError(f'{method} {path}: {response.status} {data}')
+    return data
+
+def _api_client(url: str, user: str, requests: int, batch_size: int, seed: int) -> Dict:
+    target = urlparse(url)
+    conn = http.client.HTTPConnection(target.hostname, target.port, timeout=60)
+    rows = synthetic_rows(requests * batch_size, seed)
+    latencies, added, errors = [], 0, 0
+    try:
+        for i in range(requests):
+            started = time.perf_counter()
+            try:
+                result = _request(conn, 'POST', f'/transactions?user={user}',
+                                  rows[i * batch_size:(i + 1) * batch_size])
+                added += result['added']
+            except Exception:
+                errors += 1
+                conn.close()
+            latencies.append(time.perf_counter() - started)
+    finally:
+        conn.close()
+    return {'latencies': latencies, 'added': added, 'errors': errors}
+
+def api_load_test(url: Optional[str] = None, clients: int = 8, requests: int = 50,
+                  batch_size: int = 20, user: str = LOADTEST_USER, keep_data: bool = False) -> Dict:
+    """Post clients x requests batches of batch_size rows and measure ingest.
+
+    Without url a local server is started in this process on a free port,
+    against a new temporary data directory (never the real data), removed
+    afterwards unless keep_data. Rows go to the given user's ledger
+    (data_<user>.csv). Returns rows added, rows per second, request latency
+    percentiles (ms), errors, the server's commit count and mean rows per
+    commit, and the scratch data_dir (None with url or once removed).
+    """
+    server = data_dir = None
+    if url is None:
+        from modules import api, data_handler
+        previous_dir = data_handler.BASE_DIR
+        data_dir = tempfile.mkdtemp(prefix='pft-loadtest-')
+        data_handler.set_data_dir(data_dir)
+        server = api.make_server(port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://{api.DEFAULT_HOST}:{server.server_address[1]}'
+    try:
+        stats_conn = http.client.HTTPConnection(urlparse(url).hostname, urlparse(url).port, timeout=60)
+        before = _request(stats_conn, 'GET', '/stats')
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients) as pool:
+            results = list(pool.map(lambda i: _api_client(url, user, requests, batch_size, seed=i),
+                                    range(clients)))
+        elapsed = time.perf_counter() - started
+        after = _request(stats_conn, 'GET', '/stats')
+        stats_conn.close()
+    finally:
+        if server is not None:
+            api.stop_server(server)
+            data_handler.set_data_dir(previous_dir)
+            if not keep_data:
+                shutil.rmtree(data_dir, ignore_errors=True)
+                data_dir = None
+    added = sum(r['added'] for r in results)
+    commits = after['commits'] - before['commits']
+    return {
+        'url': url,
+        'clients': clients,
+        'requests': clients * requests,
+        'rows': added,
+        'seconds': elapsed,
+        'rows_per_second': added / elapsed if elapsed else 0.0,
+        'latency_ms': percentiles([s for r in results for s in r['latencies']]),
+        'errors': sum(r['errors'] for r in results),
+        'commits': commits,
+        'rows_per_commit': (after['rows'] - before['rows']) / commits if commits else 0.0,
+        'data_dir': data_dir,
+    }
+
+# Streamlit sessions. By default each simulated session is an AppTest
+# instance in its own worker process (AppTest swaps a process-global Runtime in
+# and out on every run, so two sessions cannot share a process); all of them
+# read and write the same ledger files.
+#
+# That is not how the app is deployed. A Streamlit server runs every session's
+# script on a thread of one process, so sessions share data_handler's module
+# state: the in-memory indexes that writes patch in place and the mapped
+# column mirrors. The current user is per thread, and the app sets it from the
+# session on every run.
+# The process mode exercises the file-level locking between writers but cannot
+# see races on that shared state; threaded mode (threads=True) can. It records
+# the data_handler calls of one real AppTest run of streamlit_app.py and runs
+# each session as a thread that replays them on every rerun. With
+# switch_users=True sessions also get a 'switch' action that changes the
+# session's user the way the sidebar does. Ledger changes are counted per
+# user the session believes it is on, so a write that lands in another
+# session's ledger shows up as a violation.
+#
+# In both modes uploads cannot be scripted (AppTest has no file_uploader), so
+# an 'import' calls add_transactions() directly the way the importer does, and
+# the app only sees the result on the following rerun.
+
+def _io_counters() -> Dict[str, int]:
+    """This process's read/write syscalls and bytes (Linux only, else empty)."""
+    try:
+        with open('/proc/self/io', 'r') as f:
+            return {k: int(v) for k, v in (line.split(':') for line in f)}
+    except Exception:
+        return {}
+
+def _widget(at, kind: str, label: str):
+    return next(w for w in getattr(at, kind) if w.label == label)
+
+def _failed(at) -> bool:
+    return bool(at.exception) or any(str(e.value).startswith('Error') for e in at.error)
+
+def _app_session(task) -> Dict:
+    """Drive one scripted session (runs in a worker process)."""
+    session, reruns, seed, data_dir = task
+    from streamlit.testing.v1 import AppTest
+    from modules import data_handler
+    data_handler.set_data_dir(data_dir)
+    rng = np.random.default_rng(seed)
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    result = {'latencies': [], 'errors': [], 'added': 0, 'deleted': 0, 'actions': {}}
+    io_before = _io_counters()
+
+    def run(action: str):
+        started = time.perf_counter()
+        at.run()
+        result['latencies'].append(time.perf_counter() - started)
+        result['actions'][action] = result['actions'].get(action, 0) + 1
+        if at.exception:
+            result['errors'].append(f'session {session} {action}: {at.exception[0].value}')
+        return not _failed(at)
+
+    run('open')
+    for _ in range(reruns):
+        action = str(rng.choice(SESSION_ACTIONS))
+        if action == 'filter':
+            types = ['income', 'expense']
+            _widget(at, 'multiselect', 'Type').set_value(list(rng.choice(types, int(rng.integers(1, 3)), replace=False)))
+            low = float(rng.integers(0, 100))
+            _widget(at, 'slider', 'Amount Range').set_value((low, float(rng.integers(low + 100, 10001))))
+            run(action)
+        elif action == 'add':
+            _widget(at, 'number_input', 'Amount').set_value(float(rng.integers(1, 100000)) / 100)
+            _widget(at, 'button', 'Add Transaction').click()
+            result['added'] += run(action)
+        elif action == 'delete':
+            picker = _widget(at, 'multiselect', 'Select rows to delete')
+            if not picker.options:
+                run('rerun')
+                continue
+            picker.set_value([int(rng.choice(picker.options))])
+            _widget(at, 'button', 'Delete Selected').click()
+            result['deleted'] += run(action)
+        elif action == 'import':
+            rows = synthetic_rows(int(rng.integers(5, 50)), seed=int(rng.integers(1 << 30)))
+            added, _ = data_handler.add_transactions(rows, skip_duplicates=True)
+            result['added'] += added
+            run(action)
+        else:
+            run(action)
+    io_after = _io_counters()
+    result['io'] = {k: io_after[k] - io_before.get(k, 0) for k in io_after}
+    return result
+
+def check_consistency(expected_rows: Optional[int] = None) -> List[str]:
+    """Cross-check the current ledger's derived data against its rows.
+
+    Compares the row count with expected_rows (when given), the manifest
+    totals behind get_summary() with sums over the partition CSVs, and every
+    cached in-memory index with one rebuilt from scratch. Returns a list of
+    violations (empty when consistent).
+    """
+    from modules import data_handler
+    violations = []
+    csvp, _ = data_handler._user_paths()
+    manifest = data_handler._ledger_manifest(csvp)
+    rows = []
+    for key in data_handler._partition_keys(manifest):
+        path = data_handler._partition_file(csvp, key)
+        part = data_handler._read_csv(path) if os.path.exists(path) else data_handler._empty_df()
+        entry = manifest['partitions'][key]
+        if len(part) != entry['rows']:
+            violations.append(f'partition {key}: manifest says {entry["rows"]} rows, file has {len(part)}')
+        rows.append(part)
+    df = pd.concat(rows, ignore_index=True) if rows else data_handler._empty_df()
+    if expected_rows is not None and len(df) != expected_rows:
+        violations.append(f'ledger has {len(df)} rows, expected {expected_rows} from acknowledged writes')
+    income = int(df.loc[df['type'] == 'income', 'amount'].sum())
+    expense = int(df.loc[df['type'] == 'expense', 'amount'].sum())
+    precision = data_handler.get_currency()[1]
+    summary = data_handler.get_summary()
+    if summary[:2] != (data_handler.to_decimal(income, precision), data_handler.to_decimal(expense, precision)):
+        violations.append(f'get_summary() {summary[:2]} does not match the rows ({income}, {expense} minor units)')
+    frame = data_handler.ledger_frame()
+    if len(frame) != len(df) or not np.array_equal(frame['fingerprint'].to_numpy(), data_handler._fingerprints(df)):
+        violations.append('columnar mirrors do not match the partition files')
+    for name, (cache, build, _) in data_handler._INDEXES.items():
+        cached = cache.get(csvp)
+        if cached is None or cached['stamp'] != data_handler._ledger_version(csvp):
+            continue
+        fresh = build(data_handler.ledger_frames())
+        for field, value in fresh.items():
+            same = np.array_equal(cached[field], value) if isinstance(value, np.ndarray) else cached[field] == value
+            if not same:
+                violations.append(f'{name} index field {field!r} differs from a rebuild')
+    return violations
+
+THREAD_ACTIONS = SESSION_ACTIONS + ['switch']
+# Calls a threaded session does not replay: the session sets its own user.
+_NOT_REPLAYED = {'set_user', 'as_user', 'set_data_dir'}
+
+def _record_script_run() -> List[tuple]:
+    """The data_handler calls one plain run of streamlit_app.py makes, in
+    order, as (name, args, kwargs). Recorded from a real AppTest run against
+    the current data directory, so the replay follows the app as it changes.
+    Only top-level calls are kept, not the ones data_handler makes itself."""
+    from streamlit.testing.v1 import AppTest
+    from modules import data_handler
+    calls, depth = [], [0]
+
+    def recorder(name, func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not depth[0]:
+                calls.append((name, args, kwargs))
+            depth[0] += 1
+            try:
+                return func(*args, **kwargs)
+            finally:
+                depth[0] -= 1
+        return wrapper
+
+    originals = {name: func for name, func in vars(data_handler).items()
+                 if not name.startswith('_') and callable(func)
+                 and getattr(func, '__module__', None) == data_handler.__name__}
+    for name, func in originals.items():
+        setattr(data_handler, name, recorder(name, func))
+    try:
+        at = AppTest.from_file(APP_PATH, default_timeout=120).run()
+    finally:
+        for name, func in originals.items():
+            setattr(data_handler, name, func)
+    if at.exception:
+        raise RuntimeError(f'recording the app run failed: {at.exception[0].value}')
+    return [c for c in calls if c[0] not in _NOT_REPLAYED]
+
+def _replay(data_handler, calls: List[tuple]) -> Optional[pd.DataFrame]:
+    """Make the recorded calls of one script run; returns the ledger the run
+    displayed (its first get_transactions() result)."""
+    df = None
+    for name, args, kwargs in calls:
+        result = getattr(data_handler, name)(*args, **kwargs)
+        if name == 'get_transactions' and df is None:
+            df = result
+    return df
+
+def _thread_session(task) -> Dict:
+    """Drive one session as a thread of this process (threaded mode)."""
+    session, reruns, seed, calls, session_actions = task
+    from modules import data_handler
+    rng = np.random.default_rng(seed)
+    result = {'latencies': [], 'errors': [], 'changes': {}, 'actions': {}}
+    state = {'user': None, 'df': None}
+
+    def change(n: int):
+        key = state['user'] or ''
+        result['changes'][key] = result['changes'].get(key, 0) + n
+
+    def run(action: str, write=None):
+        started = time.perf_counter()
+        data_handler.set_user(state['user'])
+        try:
+            if write is not None:
+                write()
+            state['df'] = _replay(data_handler, calls)
+        except Exception as e:
+            result['errors'].append(f'session {session} {action}: {type(e).__name__}: {e}')
+        result['latencies'].append(time.perf_counter() - started)
+        result['actions'][action] = result['actions'].get(action, 0) + 1
+
+    def add():
+        data_handler.add_transaction(str(np.datetime64('today', 'D')), float(rng.integers(1, 100000)) / 100,
+                                     'Food', 'expense')
+        change(1)
+
+    def delete():
+        df = state['df']
+        if df is None or df.empty:
+            return
+        try:
+            data_handler.delete_transaction([int(rng.choice(df.index))])
+            change(-1)
+        except IndexError:
+            # The row picked from the previous run's view is gone; the app
+            # shows an error and nothing changes.
+            pass
+
+    def import_rows():
+        rows = synthetic_rows(int(rng.integers(5, 50)), seed=int(rng.integers(1 << 30)))
+        added, _ = data_handler.add_transactions(rows, skip_duplicates=True)
+        change(added)
+
+    def switch():
+        state['user'] = f'{LOADTEST_USER}{session}' if state['user'] is None else None
+        data_handler.set_user(state['user'])
+
+    run('open')
+    for _ in range(reruns):
+        action = str(rng.choice(session_actions))
+        if action == 'filter':
+            days = np.sort(np.datetime64('today', 'D') - rng.integers(0, 730, 2))
+            run(action, lambda: data_handler.get_period_summary(str(days[0]), str(days[1])))
+        else:
+            run(action, {'add': add, 'delete': delete, 'import': import_rows, 'switch': switch}.get(action))
+    return result
+
+def streamlit_load_test(sessions: int = 4, reruns: int = 10, rows: int = 5000, seed: int = 0,
+                        data_dir: Optional[str] = None, threads: bool = False,
+                        switch_users: bool = False, keep_data: bool = False) -> Dict:
+    """Run `sessions` concurrent scripted app sessions of `reruns` actions each.
+
+    The app runs against a synthetic ledger of `rows` transactions in data_dir
+    (default: a new temporary directory, removed afterwards unless keep_data),
+    never the real data. Sessions are AppTest instances in worker processes,
+    or with threads=True threads of this process replaying the data_handler
+    calls of a recorded script run (see the notes above). Actions are picked
+    at random from SESSION_ACTIONS; threaded sessions also switch user with
+    switch_users. Returns per-rerun latency percentiles (ms), file I/O summed
+    over the session processes, errors raised by the app, and consistency
+    violations found afterwards in every ledger the sessions wrote (see
+    check_consistency). 'data_dir' is None when the scratch data was removed.
+    """
+    from modules import data_handler
+    scratch = data_dir is None
+    data_dir = data_dir or tempfile.mkdtemp(prefix='pft-loadtest-')
+    previous_dir, previous_user = data_handler.BASE_DIR, data_handler.current_user()
+    data_handler.set_data_dir(data_dir)
+    data_handler.set_user(None)
+    try:
+        data_handler.init_db()
+        data_handler.add_transactions(synthetic_rows(rows, seed))
+        initial = sum(len(f) for f in data_handler.ledger_frames())
+        started = time.perf_counter()
+        if threads:
+            calls = _record_script_run()
+            session_actions = THREAD_ACTIONS if switch_users else SESSION_ACTIONS
+            tasks = [(i, reruns, seed + 1 + i, calls, session_actions) for i in range(sessions)]
+            started = time.perf_counter()
+            io_before = _io_counters()
+            with ThreadPoolExecutor(max_workers=sessions) as pool:
+                results = list(pool.map(_thread_session, tasks))
+            io_after = _io_counters()
+            results[0]['io'] = {k: io_after[k] - io_before.get(k, 0) for k in io_after}
+        else:
+            tasks = [(i, reruns, seed + 1 + i, data_dir) for i in range(sessions)]
+            with ProcessPoolExecutor(max_workers=sessions) as pool:
+                results = list(pool.map(_app_session, tasks))
+            for r in results:
+                r['changes'] = {'': r['added'] - r['deleted']}
+        elapsed = time.perf_counter() - started
+        expected = {'': initial}
+        for r in results:
+            for user, n in r['changes'].items():
+                expected[user] = expected.get(user, 0) + n
+        violations = []
+        for user, n in sorted(expected.items()):
+            data_handler.set_user(user or None)
+            violations += [f'{user or "default"}: {v}' for v in check_consistency(n)]
+    finally:
+        data_handler.set_data_dir(previous_dir)
+        data_handler.set_user(previous_user)
+        if scratch and not keep_data:
+            shutil.rmtree(data_dir, ignore_errors=True)
+            data_dir = None
+    actions: Dict[str, int] = {}
+    io: Dict[str, int] = {}
+    for r in results:
+        for action, n in r['actions'].items():
+            actions[action] = actions.get(action, 0) + n
+        for k, n in r.get('io', {}).items():
+            io[k] = io.get(k, 0) + n
+    latencies = [s for r in results for s in r['latencies']]
+    return {
+        'data_dir': data_dir,
+        'mode': 'threads' if threads else 'processes',
+        'sessions': sessions,
+        'reruns': len(latencies),
+        'seconds': elapsed,
+        'reruns_per_second': len(latencies) / elapsed if elapsed else 0.0,
+        'latency_ms': percentiles(latencies),
+        'actions': actions,
+        'io': io,
+        'errors': [e for r in results for e in r['errors']],
+        'violations': violations,
+    }
@@ -0,0 +1,155 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+from typing import Optional, List, Dict
+import pandas as pd
+from modules import data_handler, visualizer
+from modules.analytics import DEFAULT_USER, ledger_targets, parallel_map
+
+# Batch monthly reports: for every user and month, three chart PNGs plus a PDF
+# statement under <out_dir>/<user>/<YYYY-MM>/. Each month is keyed by a hash of
+# its rows; months whose hash matches the user's manifest are not re-rendered,
+# and months that no longer have any rows are removed. Workers hash each
+# user's months and the parent compares them with the manifests; every
+# (user, month) to render is then a separate pool task, so one user with a
+# long history does not keep a single worker busy.
+
+# Bump when the rendered output changes so existing reports are regenerated.
+RENDER_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+CHARTS = {
+    'spending_by_category.png': visualizer.save_spending_by_category,
+    'income_vs_expense.png': visualizer.save_income_vs_expense,
+    'expense_pie.png': visualizer.save_pie_by_category,
+}
+STATEMENT_NAME = 'statement.pdf'
+_MONTH_RE = re.compile(r'\d{4}-\d{2}')
+
+def month_hash(month_df: pd.DataFrame) -> str:
+    """Content hash of one month's transactions, independent of row order."""
+    rows = month_df[data_handler.COLUMNS].astype(str).sort_values(data_handler.COLUMNS)
+    h = hashlib.sha256(f'v{RENDER_VERSION}\n'.encode())
+    h.update(rows.to_csv(index=False).encode('utf-8'))
+    return h.hexdigest()
+
+def _load_manifest(user_dir: str) -> Dict[str, str]:
+    try:
+        with open(os.path.join(user_dir, MANIFEST_NAME), 'r') as f:
+            manifest = json.load(f)
+        if isinstance(manifest, dict):
+            return manifest
+    except Exception:
+        pass
+    return {}
+
+def _save_manifest(user_dir: str, manifest: Dict[str, str]):
+    tmp = os.path.join(user_dir, MANIFEST_NAME + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp, os.path.join(user_dir, MANIFEST_NAME))
+
+def _write_statement(month_df: pd.DataFrame, filename: str, title: str, chart: Optional[str] = None):
+    from fpdf import FPDF
+    income = month_df.loc[month_df['type'] == 'income', 'amount'].sum()
+    expense = month_df.loc[month_df['type'] == 'expense', 'amount'].sum()
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font('Arial', 'B', 14)
+    pdf.cell(0, 10, title, ln=1)
+    pdf.set_font('Arial', size=10)
+    pdf.cell(0, 6, f'Total Income: {income:.2f} | Total Expense: {expense:.2f} | Savings: {income - expense:.2f}', ln=1)
+    if chart and os.path.exists(chart):
+        pdf.image(chart, w=120)
+    colw = pdf.w / (len(data_handler.COLUMNS) + 1)
+    rowh = pdf.font_size * 1.6
+    for c in data_handler.COLUMNS:
+        pdf.cell(colw, rowh, str(c), border=1)
+    pdf.ln(rowh)
+    for r in month_df.sort_values('date')[data_handler.COLUMNS].itertuples(index=False):
+        for itm in r:
+            pdf.cell(colw, rowh, str(itm), border=1)
+        pdf.ln(rowh)
+    pdf.output(filename)
+
+def render_month(month_df: pd.DataFrame, month_dir: str, title: str):
+    os.makedirs(month_dir, exist_ok=True)
+    for fname, render in CHARTS.items():
+        render(month_df, os.path.join(month_dir, fname))
+    _write_statement(month_df, os.path.join(month_dir, STATEMENT_NAME), title,
+                     chart=os.path.join(month_dir, 'spending_by_category.png'))
+
+def _month_digests(user: Optional[str]) -> Dict[str, str]:
+    """month_hash of every month in one user's ledger (runs in a worker)."""
+    with data_handler.as_user(user):
+        df = data_handler.get_transactions()
+    if df.empty:
+        return {}
+    df['month'] = pd.to_datetime(df['date']).dt.to_period('M').astype(str)
+    return {month: month_hash(month_df.drop(columns='month')) for month, month_df in df.groupby('month')}
+
+def _render_task(task) -> Dict:
+    """Render one user's month (runs in a worker)."""
+    user, month, month_dir = task
+    name = user or DEFAULT_USER
+    start = pd.Period(month, 'M')
+    try:
+        with data_handler.as_user(user):
+            month_df = data_handler.get_transactions(str(start.start_time.date()), str(start.end_time.date()))
+        render_month(month_df, month_dir, f'Statement {name} {month}')
+        return {'user': user, 'month': month, 'digest': month_hash(month_df), 'error': None}
+    except Exception as e:
+        return {'user': user, 'month': month, 'digest': None, 'error': str(e)}
+
+def _prune(user_dir: str, manifest: Dict[str, str], months) -> None:
+    """Drop manifest entries and month directories for months without rows."""
+    for month in [m for m in manifest if m not in months]:
+        del manifest[month]
+    if os.path.isdir(user_dir):
+        for entry in os.listdir(user_dir):
+            path = os.path.join(user_dir, entry)
+            if _MONTH_RE.fullmatch(entry) and entry not in months and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+
+def generate_reports(out_dir: str = 'reports', users: Optional[List[str]] = None,
+                     include_default: bool = True, max_workers: Optional[int] = None,
+                     force: bool = False) -> List[Dict]:
+    """Render reports for every user and month, skipping unchanged months.
+
+    Changed months of all users are spread over a process pool; returns one
+    result dict per user with the months rendered, the number skipped, the
+    months removed and any per-month errors.
+    """
+    targets = ledger_targets(users, include_default)
+    out_dir = os.path.abspath(out_dir)
+    results, manifests, tasks = {}, {}, []
+    digests = parallel_map(_month_digests, targets, max_workers)
+    for user, months in zip(targets, digests):
+        name = user or DEFAULT_USER
+        user_dir = os.path.join(out_dir, name)
+        manifest = {} if force else _load_manifest(user_dir)
+        removed = sorted(m for m in manifest if m not in months)
+        _prune(user_dir, manifest, months)
+        results[user] = {'user': name, 'rendered': [], 'skipped': 0, 'removed': removed, 'errors': {}}
+        manifests[user] = manifest
+        for month, digest in months.items():
+            month_dir = os.path.join(user_dir, month)
+            if manifest.get(month) == digest and os.path.exists(os.path.join(month_dir, STATEMENT_NAME)):
+                results[user]['skipped'] += 1
+            else:
+                tasks.append((user, month, month_dir))
+    rendered = parallel_map(_render_task, tasks, max_workers)
+    for r in rendered:
+        if r['error']:
+            results[r['user']]['errors'][r['month']] = r['error']
+        else:
+            manifests[r['user']][r['month']] = r['digest']
+            results[r['user']]['rendered'].append(r['month'])
+    # Only the parent writes manifests, after every worker has finished.
+    for user, manifest in manifests.items():
+        user_dir = os.path.join(out_dir, user or DEFAULT_USER)
+        if manifest or os.path.isdir(user_dir):
+            os.makedirs(user_dir, exist_ok=True)
+            _save_manifest(user_dir, manifest)
+    return list(results.values())
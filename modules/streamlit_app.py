@@ -7,6 +7,10 @@ from modules import data_handler, visualizer
 
 st.set_page_config(page_title="Personal Finance Tracker", layout="wide")
 
+# The user belongs to the browser session. data_handler keeps it per thread and
+# every script run starts on a new thread, so it is set again on each run.
+data_handler.set_user(st.session_state.get('user'))
+
 # Sidebar - Category Management
 st.sidebar.header("Manage Categories")
 categories = data_handler.get_categories()
@@ -33,7 +37,8 @@ st.sidebar.markdown("---")
 st.sidebar.header("User / Utilities")
 user = st.sidebar.text_input("Switch User (leave blank for default)")
 if st.sidebar.button("Switch User"):
-    data_handler.set_user(user if user else None)
+    st.session_state['user'] = user if user else None
+    data_handler.set_user(st.session_state['user'])
     st.sidebar.success(f"Switched to user: {user or 'default'}")
     st.rerun()
 
@@ -43,31 +48,35 @@ if st.sidebar.button("Undo Last Action"):
         st.sidebar.success("Last action undone.")
         st.rerun()
     else:
-        st.sidebar.info("Nothing to undo.")
+        st.sidebar.info("Nothing to undo (or the last action's rows have changed since).")
 
 # CSV Importer
 st.sidebar.markdown("---")
 st.sidebar.header("Import Transactions (CSV)")
-uploaded = st.sidebar.file_uploader("Upload CSV (date,amount,category,type)", type=['csv'])
+uploaded = st.sidebar.file_uploader("Upload CSV (date,amount,category,type[,ref])", type=['csv'])
 if uploaded is not None:
     try:
         import io
         uploaded_df = pd.read_csv(io.BytesIO(uploaded.read()))
-        # Expect columns: date, amount, category, type
+        # Expect columns: date, amount, category, type and optionally a bank reference
         st.sidebar.write(f"Imported {len(uploaded_df)} rows")
+        skip_duplicates = st.sidebar.checkbox("Skip rows already in the dataset", value=True)
         if st.sidebar.button("Append Imported to Dataset"):
-            added = 0
-            for _, row in uploaded_df.iterrows():
-                try:
-                    data_handler.add_transaction(str(row['date']), row['amount'], row['category'], row['type'])
-                    added += 1
-                except Exception as e:
-                    # skip invalid rows
-                    continue
-            st.sidebar.success(f"Appended {added} rows")
+            # One vectorised validation pass and a single write; invalid rows are skipped
+            added, rejected = data_handler.add_transactions(uploaded_df, skip_duplicates=skip_duplicates)
+            st.session_state['import_report'] = (added, rejected)
             st.rerun()
     except Exception as e:
         st.sidebar.error(f"Failed to read CSV: {e}")
+if 'import_report' in st.session_state:
+    added, rejected = st.session_state.pop('import_report')
+    duplicates = rejected[rejected['reason'] == 'duplicate']
+    st.sidebar.success(f"Appended {added} rows")
+    if len(rejected) > len(duplicates):
+        st.sidebar.warning(f"Skipped {len(rejected) - len(duplicates)} invalid rows")
+    if not duplicates.empty:
+        with st.sidebar.expander(f"Skipped {len(duplicates)} duplicate rows"):
+            st.dataframe(duplicates.drop(columns=['reason']))
 
 # Sidebar - Add Transaction
 st.sidebar.header("Add Transaction")
@@ -158,25 +167,58 @@ st.metric("Savings", f"{savings:.2f}")
 
 # Budget Alert
 budget_limit = st.sidebar.number_input("Budget Limit", min_value=0.0, value=1000.0, step=1.00, format="%.2f")
+budget_period = st.sidebar.radio("Budget Period", ["All time", "This month"], horizontal=True)
+if budget_period == "This month":
+    _, budget_expense, _ = data_handler.get_period_summary(start=data_handler.month_start())
+else:
+    budget_expense = total_expense
 if budget_limit <= 0:
     st.warning("Set a budget limit greater than 0 to enable alerts and progress.")
 else:
-    if total_expense > budget_limit:
+    if budget_expense > budget_limit:
         st.error("Budget Exceeded!")
     else:
         st.success("Within Budget")
     # Show budget usage as a progress bar and percentage
     try:
-        usage = float(total_expense) / float(budget_limit)
+        usage = float(budget_expense) / float(budget_limit)
         usage_clamped = min(1.0, max(0.0, usage))
         st.progress(usage_clamped)
-        st.caption(f"Budget usage: {usage * 100:.1f}% ({total_expense:.2f} / {budget_limit:.2f})")
+        st.caption(f"Budget usage: {usage * 100:.1f}% ({budget_expense:.2f} / {budget_limit:.2f})")
     except Exception:
         pass
 
+# Category Budgets
+st.sidebar.header("Category Budgets")
+budget_category = st.sidebar.selectbox("Budget Category", categories)
+budget_cycle = st.sidebar.selectbox("Budget Cycle", data_handler.BUDGET_PERIODS)
+budget_amount = st.sidebar.number_input("Category Limit", min_value=0.01, value=500.0, step=1.00, format="%.2f")
+if st.sidebar.button("Save Budget"):
+    try:
+        data_handler.set_budget(budget_category, budget_amount, budget_cycle)
+        st.sidebar.success(f"Budget saved for '{budget_category}' ({budget_cycle}).")
+        st.rerun()
+    except Exception as e:
+        st.sidebar.error(f"Error: {e}")
+if st.sidebar.button("Remove Budget"):
+    if data_handler.remove_budget(budget_category, budget_cycle):
+        st.sidebar.success(f"Budget removed for '{budget_category}' ({budget_cycle}).")
+        st.rerun()
+    else:
+        st.sidebar.info("No such budget.")
+
+statuses = data_handler.budget_status()
+if statuses:
+    st.subheader("Category Budgets")
+    for b in statuses:
+        label = f"{b['category']} ({b['period']} from {b['period_start']}): {b['spent']:.2f} / {b['limit']:.2f}"
+        if b['breached']:
+            st.error(f"Over budget - {label}")
+        st.progress(min(1.0, max(0.0, b['usage'])), text=label)
+
 # Tabs for Visualizations & Analytics
 st.subheader("Visualizations & Analytics")
-tabs = st.tabs(["Spending by Category", "Monthly Trends", "Expense Pie Chart", "Monthly Summary"]) 
+tabs = st.tabs(["Spending by Category", "Monthly Trends", "Expense Pie Chart", "Monthly Summary", "Daily Cash Flow", "Forecast"]) 
 
 with tabs[0]:
     expense_df = df_filtered[df_filtered["type"] == "expense"]
@@ -209,6 +251,35 @@ with tabs[3]:
     except Exception as e:
         st.info(f"No monthly summary available. {e}")
 
+with tabs[4]:
+    if not df_filtered.empty:
+        dates = pd.to_datetime(df_filtered["date"])
+        first, last = dates.min().date(), dates.max().date()
+        if first < last:
+            # Narrowing the window re-aggregates on the server at a finer resolution.
+            window = st.slider("Date window", min_value=first, max_value=last, value=(first, last))
+        else:
+            window = (first, last)
+        # The balance is the whole ledger's; the sidebar filters only narrow
+        # the net flow below it.
+        balance = data_handler.balance_series(window[0], window[1])
+        fig = visualizer.plot_daily_cashflow(df_filtered, start=window[0], end=window[1], balance=balance)
+        st.plotly_chart(fig, width='stretch')
+    else:
+        st.info("No data to show.")
+
+with tabs[5]:
+    # Projected from recurring.json rules and recent averages; nothing is written.
+    horizon = st.slider("Months ahead", min_value=1, max_value=60, value=12)
+    granularity = st.radio("Granularity", ["Daily", "Monthly"], horizontal=True)
+    try:
+        fc = data_handler.forecast(horizon, freq='D' if granularity == "Daily" else 'M')
+        st.plotly_chart(visualizer.plot_forecast(fc), width='stretch')
+        if granularity == "Monthly":
+            st.dataframe(fc.round(2), width='stretch')
+    except Exception as e:
+        st.info(f"No forecast available. {e}")
+
 # Delete Transactions
 st.subheader("Delete Transactions")
 selected_rows = st.multiselect("Select rows to delete", df_filtered.index.tolist())
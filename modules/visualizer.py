@@ -1,14 +1,16 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import plotly.express as px
+
+# Plotly is imported inside each chart function so that importing this module
+# (done by the Tk GUI and on every Streamlit rerun) stays cheap.
 
 def plot_spending_by_category(df):
+    import plotly.express as px
     category_totals = df[df['type']=='expense'].groupby('category')['amount'].sum().reset_index()
     fig = px.bar(category_totals, x='category', y='amount', title='Spending by Category', labels={'amount':'Amount', 'category':'Category'})
     return fig
 
 def plot_income_vs_expense(df):
+    import plotly.express as px
     monthly = df.copy()
     monthly['month'] = pd.to_datetime(monthly['date']).dt.to_period('M').astype(str)
     summary = monthly.groupby(['month', 'type'])['amount'].sum().reset_index()
@@ -16,6 +18,125 @@ def plot_income_vs_expense(df):
     return fig
 
 def plot_pie_by_category(df):
+    import plotly.express as px
     category_totals = df[df['type']=='expense'].groupby('category')['amount'].sum().reset_index()
     fig = px.pie(category_totals, values='amount', names='category', title='Expense Distribution by Category')
-    return fig
\ No newline at end of file
+    return fig
+
+# Daily cash flow / running balance. A long daily history is reduced on the
+# server to about max_points points per trace before it reaches the browser,
+# and drawn with WebGL (Scattergl) traces. Callers refine the view by passing
+# the visible window as start/end: the narrower the window, the closer the
+# chart gets to one point per day.
+
+def daily_cashflow(df):
+    """Net flow per day and the running balance at the end of each day."""
+    if df.empty:
+        return pd.DataFrame(columns=['net', 'balance'], index=pd.DatetimeIndex([], name='date'))
+    signed = df['amount'].where(df['type'] == 'income', -df['amount'])
+    daily = signed.groupby(pd.to_datetime(df['date'])).sum().sort_index()
+    daily.index.name = 'date'
+    return pd.DataFrame({'net': daily, 'balance': daily.cumsum()})
+
+def downsample_minmax(values, n_out):
+    """Indices of a min/max decimation of values down to about n_out points.
+
+    The series is cut into n_out // 2 equal buckets and the lowest and highest
+    point of each bucket are kept (in their original order), so spikes survive
+    decimation unlike plain striding or averaging.
+    """
+    import numpy as np
+    values = np.asarray(values)
+    n = len(values)
+    if n <= n_out or n_out < 2:
+        return np.arange(n)
+    n_buckets = n_out // 2
+    bucket = np.arange(n) * n_buckets // n
+    order = np.lexsort((values, bucket))
+    starts = np.searchsorted(bucket[order], np.arange(n_buckets))
+    ends = np.append(starts[1:], n) - 1
+    return np.unique(np.concatenate([order[starts], order[ends]]))
+
+def plot_daily_cashflow(df, start=None, end=None, max_points=2000, balance=None):
+    """Running balance above, daily net flow of df below.
+
+    balance is an optional date-indexed Series (e.g. data_handler.balance_series)
+    to plot instead of accumulating df; pass it when df is a filtered view,
+    because a balance summed over filtered rows is not the account balance.
+    """
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    daily = daily_cashflow(df)
+    if balance is None:
+        # The balance is accumulated over the full history before cropping, so
+        # the first visible point carries everything before the window.
+        balance = daily['balance']
+    if start is not None:
+        daily = daily[daily.index >= pd.Timestamp(start)]
+        balance = balance[balance.index >= pd.Timestamp(start)]
+    if end is not None:
+        daily = daily[daily.index <= pd.Timestamp(end)]
+        balance = balance[balance.index <= pd.Timestamp(end)]
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.08,
+                        row_heights=[0.6, 0.4], subplot_titles=('Running Balance', 'Daily Net Cash Flow'))
+    for row, series in ((1, balance.rename('balance')), (2, daily['net'])):
+        idx = downsample_minmax(series.to_numpy(), max_points)
+        part = series.iloc[idx]
+        fig.add_trace(go.Scattergl(x=part.index, y=part, mode='lines', name=series.name.title()), row=row, col=1)
+    fig.update_layout(title='Daily Cash Flow', showlegend=False)
+    return fig
+
+def plot_forecast(forecast, max_points=2000):
+    """Chart of data_handler.forecast(): projected balance above, projected
+    income and expense per period below."""
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.08,
+                        row_heights=[0.6, 0.4], subplot_titles=('Projected Balance', 'Projected Income and Expense'))
+    for row, col in ((1, 'balance'), (2, 'income'), (2, 'expense')):
+        idx = downsample_minmax(forecast[col].to_numpy(), max_points)
+        part = forecast.iloc[idx]
+        fig.add_trace(go.Scattergl(x=part.index, y=part[col], mode='lines', name=col.title()), row=row, col=1)
+    fig.update_layout(title='Cash-Flow Forecast')
+    return fig
+
+# Static (PNG) renderings of the charts above for headless report generation.
+# They use matplotlib's Figure API directly so no GUI backend or pyplot global
+# state is involved, which keeps them safe to call from worker processes.
+
+def _static_figure():
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(6, 4))
+    return fig, fig.add_subplot(1, 1, 1)
+
+def save_spending_by_category(df, path):
+    fig, ax = _static_figure()
+    category_totals = df[df['type']=='expense'].groupby('category')['amount'].sum()
+    if not category_totals.empty:
+        ax.bar(category_totals.index.astype(str), category_totals.values)
+    else:
+        ax.text(0.5, 0.5, 'No expense data', ha='center')
+    ax.set_title('Spending by Category')
+    ax.set_ylabel('Amount')
+    fig.tight_layout()
+    fig.savefig(path)
+
+def save_income_vs_expense(df, path):
+    fig, ax = _static_figure()
+    totals = df.groupby('type')['amount'].sum().reindex(['income', 'expense'], fill_value=0)
+    ax.bar(totals.index, totals.values, color=['#2ca02c', '#d62728'])
+    ax.set_title('Income vs Expense')
+    ax.set_ylabel('Amount')
+    fig.tight_layout()
+    fig.savefig(path)
+
+def save_pie_by_category(df, path):
+    fig, ax = _static_figure()
+    category_totals = df[df['type']=='expense'].groupby('category')['amount'].sum()
+    if not category_totals.empty:
+        ax.pie(category_totals.values, labels=category_totals.index.astype(str), autopct='%1.1f%%')
+    else:
+        ax.text(0.5, 0.5, 'No expense data', ha='center')
+    ax.set_title('Expense Distribution by Category')
+    fig.tight_layout()
+    fig.savefig(path)
@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from modules import data_handler
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    """data_handler on an empty data directory, default ledger selected."""
+    previous = data_handler.BASE_DIR
+    data_handler.set_data_dir(str(tmp_path))
+    try:
+        with data_handler.as_user(None):
+            yield data_handler
+    finally:
+        data_handler.set_data_dir(previous)
@@ -0,0 +1,98 @@
+import gzip
+import json
+import os
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+THIS_YEAR = date.today().year
+
+
+def _manifest(dh):
+    with open(dh._manifest_path(dh.CSV_PATH)) as f:
+        return json.load(f)
+
+
+def _write_ledger(dh, lines):
+    with open(dh.CSV_PATH, 'w') as f:
+        f.write('date,amount_minor,category,type\n' + ''.join(l + '\n' for l in lines))
+    dh._save_meta(dh.CSV_PATH, {'currency': 'USD', 'precision': 2})
+
+
+def test_back_dated_add_goes_to_its_closed_year(ledger):
+    ledger.add_transaction(f'{THIS_YEAR}-01-05', 10, 'Food', 'expense')
+    ledger.add_transaction('2020-03-01', '2.50', 'Food', 'expense')
+    assert os.path.exists(ledger._partition_file(ledger.CSV_PATH, '2020'))
+    partitions = _manifest(ledger)['partitions']
+    assert partitions['2020']['rows'] == 1
+    assert partitions['open']['rows'] == 1
+    df = ledger.get_transactions()
+    # Closed years come first in ledger order.
+    assert list(df['date']) == ['2020-03-01', f'{THIS_YEAR}-01-05']
+    assert ledger.get_summary()[1] == Decimal('12.50')
+
+
+def test_edit_into_another_year_and_undo(ledger):
+    ledger.add_transaction(f'{THIS_YEAR}-01-05', 10, 'Food', 'expense')
+    ledger.add_transaction(f'{THIS_YEAR}-01-06', 20, 'Rent', 'expense')
+    ledger.edit_transaction(1, date='2021-07-01')
+    assert '2021' in _manifest(ledger)['partitions']
+    assert sorted(ledger.get_transactions()['date']) == ['2021-07-01', f'{THIS_YEAR}-01-05']
+    assert ledger.undo_last()
+    df = ledger.get_transactions()
+    assert list(df['date']) == [f'{THIS_YEAR}-01-05', f'{THIS_YEAR}-01-06']
+    assert list(df['amount']) == [10, 20]
+    assert '2021' not in _manifest(ledger)['partitions']
+    assert not os.path.exists(ledger._partition_file(ledger.CSV_PATH, '2021'))
+
+
+def test_past_years_are_closed_on_first_read(ledger):
+    _write_ledger(ledger, ['2019-05-01,1000,Salary,income', f'{THIS_YEAR}-01-02,250,Food,expense',
+                           '2020-02-03,125,Food,expense'])
+    df = ledger.read_ledger()
+    assert list(df['date']) == ['2019-05-01', '2020-02-03', f'{THIS_YEAR}-01-02']
+    assert list(df['amount']) == [1000, 125, 250]
+    manifest = _manifest(ledger)
+    assert manifest['open_from'] == THIS_YEAR
+    assert sorted(manifest['partitions']) == ['2019', '2020', 'open']
+    with gzip.open(ledger._partition_file(ledger.CSV_PATH, '2019'), 'rt') as f:
+        assert f.read().splitlines()[1] == '2019-05-01,1000,Salary,income'
+    with open(ledger.CSV_PATH) as f:
+        assert f.read().splitlines()[1:] == [f'{THIS_YEAR}-01-02,250,Food,expense']
+
+
+def test_close_years_moves_rows_into_existing_partitions(ledger):
+    ledger.add_transaction('2020-01-01', 1, 'Food', 'expense')
+    _write_ledger(ledger, ['2020-06-01,300,Food,expense', f'{THIS_YEAR}-01-02,250,Food,expense'])
+    manifest = ledger._scan_manifest(ledger.CSV_PATH)
+    ledger._close_years(ledger.CSV_PATH, manifest, THIS_YEAR)
+    assert manifest['open_from'] == THIS_YEAR
+    assert manifest['partitions']['2020']['rows'] == 2
+    assert manifest['partitions']['2020']['expense'] == 400
+    assert manifest['partitions']['open']['rows'] == 1
+
+
+def test_manifest_follows_an_outside_edit(ledger):
+    ledger.add_transaction(f'{THIS_YEAR}-01-05', 10, 'Food', 'expense')
+    assert ledger.get_summary()[1] == Decimal('10.00')
+    with open(ledger.CSV_PATH, 'a') as f:
+        f.write(f'{THIS_YEAR}-01-06,550,Food,expense\n')
+    assert ledger.get_summary()[1] == Decimal('15.50')
+    assert _manifest(ledger)['partitions']['open']['rows'] == 2
+    assert len(ledger.get_transactions()) == 2
+
+
+def test_unreadable_partition_is_refused(ledger):
+    ledger.add_transaction('2020-03-01', 5, 'Food', 'expense')
+    path = ledger._partition_file(ledger.CSV_PATH, '2020')
+    with gzip.open(path, 'wt') as f:
+        f.write('date,amount_minor,category,type\n2020-03-02,1.5,Food,expense\n')
+    with open(path, 'rb') as f:
+        damaged = f.read()
+    with pytest.raises(ValueError):
+        ledger.get_transactions()
+    with pytest.raises(ValueError):
+        ledger.add_transaction('2020-03-03', 1, 'Food', 'expense')
+    with open(path, 'rb') as f:
+        assert f.read() == damaged
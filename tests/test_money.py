@@ -0,0 +1,56 @@
+import os
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from modules import data_handler
+
+THIS_YEAR = date.today().year
+
+
+def test_legacy_ledger_is_migrated_once(ledger):
+    with open(ledger.CSV_PATH, 'w') as f:
+        f.write(f'date,amount,category,type\n{THIS_YEAR}-01-02,12.34,Food,expense\n'
+                f'{THIS_YEAR}-01-03,0.1,Salary,income\n')
+    assert list(ledger.read_ledger()['amount']) == [1234, 10]
+    assert ledger.get_summary() == (Decimal('0.10'), Decimal('12.34'), Decimal('-12.24'))
+    assert os.path.exists(ledger.CSV_PATH + '.bak')
+    with open(ledger.CSV_PATH) as f:
+        assert f.readline().strip() == 'date,amount_minor,category,type'
+    # Without the meta file the header still marks the amounts as minor units.
+    os.remove(ledger._meta_path(ledger.CSV_PATH))
+    assert list(ledger.read_ledger()['amount']) == [1234, 10]
+    assert ledger.get_summary()[1] == Decimal('12.34')
+
+
+@pytest.mark.parametrize('precision', [0, 2, 3])
+def test_scalar_and_bulk_amounts_round_alike(precision):
+    values = ['1.005', '0.125', '2.675', '0.015', '1234.5', '0.5', '0.001', '19.999', '-1', 'abc']
+    minor, valid = data_handler._parse_amounts(values, precision)
+    for value, got, ok in zip(values, minor.tolist(), valid.tolist()):
+        try:
+            expected = data_handler._to_minor(value, precision)
+        except ValueError:
+            assert not ok, value
+        else:
+            assert ok and got == expected, value
+
+
+def test_set_currency_rescales_amounts(ledger):
+    ledger.add_transaction(f'{THIS_YEAR}-01-02', '12.30', 'Food', 'expense')
+    ledger.set_currency('USD', 3)
+    assert ledger.get_currency() == ('USD', 3)
+    assert list(ledger.read_ledger()['amount']) == [12300]
+    assert ledger.get_summary()[1] == Decimal('12.300')
+    ledger.set_currency('EUR', 1)
+    assert list(ledger.read_ledger()['amount']) == [123]
+    assert ledger.get_summary()[1] == Decimal('12.3')
+
+
+def test_set_currency_refuses_to_drop_digits(ledger):
+    ledger.add_transaction(f'{THIS_YEAR}-01-02', '12.34', 'Food', 'expense')
+    with pytest.raises(ValueError):
+        ledger.set_currency('JPY', 0)
+    assert ledger.get_currency() == ('USD', 2)
+    assert list(ledger.read_ledger()['amount']) == [1234]
@@ -0,0 +1,27 @@
+import os
+import sys
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+import main
+
+
+def test_startup_within_budget():
+    assert main.startup_check()
+
+
+def test_module_missing_from_import_log_fails(monkeypatch):
+    monkeypatch.setattr(main, 'measure_import_times', lambda modules: ({}, None))
+    assert not main.startup_check()
+
+
+def test_import_failure_is_reported_not_raised():
+    times, error = main.measure_import_times(['json', 'no_such_module_for_startup_check'])
+    assert 'json' in times
+    assert 'no_such_module_for_startup_check' in error
+
+
+def test_failed_import_fails_the_check(monkeypatch):
+    monkeypatch.setitem(main.STARTUP_BUDGET_MS, 'no_such_module_for_startup_check', 10)
+    assert not main.startup_check()